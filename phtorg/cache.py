@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+
+
+class InfoCache:
+    '''On-disk cache of datetime and hash of files.
+
+    Entries are keyed by (path, size, mtime_ns), so a file that has not been
+    touched since the last run is neither parsed nor hashed again. The home
+    timezone and hash method (see hashing.hash_method()) are part of the key
+    too, as they change the results.
+
+    Datetimes are stored as naive wall times in that timezone, which the
+    caller attaches again with replace(). Going through an offset and
+    astimezone() instead would shift a wall time in the gap of a DST change
+    by an hour.
+    '''
+
+    def __init__(self, path: Path, readonly: bool = False) -> None:
+        # Worker threads share one connection, serialized by the lock
+        self.lock = threading.Lock()
+        if readonly:
+            # Only look entries up: don't touch the file, not even the schema
+            self.conn = sqlite3.connect(f'{Path(path).absolute().as_uri()}?mode=ro', uri=True, check_same_thread=False)
+            return
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache (
+                path TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                timezone TEXT,
+                hash_method TEXT,
+                dt TEXT,
+                datetime_source TEXT,
+                hash TEXT,
+                PRIMARY KEY (path, size, mtime_ns, timezone, hash_method)
+            )
+        ''')
+
+    @staticmethod
+    def _key(photo: Path, st: os.stat_result, timezone: str, hash_method: str) -> tuple:
+        return (os.path.abspath(photo), st.st_size, st.st_mtime_ns, timezone, hash_method)
+
+    def get(self, photo: Path, st: os.stat_result, timezone: str, hash_method: str) -> tuple[datetime, str, str] | None:
+        '''Return (naive datetime, datetime_source, hash), or None on cache miss'''
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT dt, datetime_source, hash FROM cache WHERE path=? AND size=? AND mtime_ns=? AND timezone=? AND hash_method=?',
+                self._key(photo, st, timezone, hash_method),
+            ).fetchone()
+        if row is None:
+            return None
+        dt, datetime_source, h = row
+        return datetime.fromisoformat(dt), datetime_source, h
+
+    def get_info(self, photo: Path, st: os.stat_result, timezone: str) -> tuple[datetime, str] | None:
+        '''Return (naive datetime, datetime_source) cached with any hash method, or None on cache miss'''
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT dt, datetime_source FROM cache WHERE path=? AND size=? AND mtime_ns=? AND timezone=? LIMIT 1',
+                (os.path.abspath(photo), st.st_size, st.st_mtime_ns, timezone),
+            ).fetchone()
+        if row is None:
+            return None
+        dt, datetime_source = row
+        return datetime.fromisoformat(dt), datetime_source
+
+    def put(self, photo: Path, st: os.stat_result, timezone: str, hash_method: str, dt: datetime, datetime_source: str, h: str) -> None:
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                self._key(photo, st, timezone, hash_method) + (dt.replace(tzinfo=None).isoformat(), datetime_source, h),
+            )
+
+    def move(self, src: Path, dst: Path) -> None:
+        '''Follow a renamed file, which keeps its size and mtime'''
+        with self.lock:
+            self.conn.execute('UPDATE OR REPLACE cache SET path=? WHERE path=?', (os.path.abspath(dst), os.path.abspath(src)))
+
+    def commit(self) -> None:
+        with self.lock:
+            self.conn.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
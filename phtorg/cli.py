@@ -1,52 +1,92 @@
 import itertools
+import contextlib
 from pathlib import Path
+from collections.abc import Iterator
 
 import click
 import tzlocal
 from tabulate import tabulate
 from phtorg.tpe import tpe_submit
 from phtorg.logging import setup_logging
+from phtorg.exiftool import ExifTool
 from phtorg.organizer import PhotoInfo
 from phtorg.organizer import PhotoOrganizer
 
 
+CACHE_FILENAME = '.phtorg_cache.sqlite'
+
+
+@contextlib.contextmanager
+def start_exiftool(enabled: bool) -> Iterator[ExifTool | None]:
+    if not enabled:
+        yield None
+        return
+    try:
+        exiftool = ExifTool()
+    except FileNotFoundError:
+        raise click.ClickException('--use-exiftool requires exiftool in PATH')
+    with exiftool:
+        yield exiftool
+
+
 @click.group()
 @click.option('--timezone', default=tzlocal.get_localzone_name(), show_default=True, help='Timezone name (e.g., "UTC", "America/Vancouver")')
 @click.option('--allow-mtime', is_flag=True, show_default=True, help='Allow using mtime as a fallback if datetime cannot be extracted from EXIF/MediaInfo')
+@click.option('--use-exiftool', is_flag=True, help='Read EXIF of JPEG/HEIC files through a long-running exiftool process')
+@click.option('--max-concurrency', type=click.IntRange(min=1), help='Number of files processed at once [default: 1 on spinning disks, the number of CPUs up to 8 otherwise]')
 @click.pass_context
-def cli(ctx, timezone: str, allow_mtime: bool):
+def cli(ctx, timezone: str, allow_mtime: bool, use_exiftool: bool, max_concurrency: int | None):
     setup_logging()
     ctx.ensure_object(dict)
     ctx.obj['timezone'] = timezone
     ctx.obj['allow_mtime'] = allow_mtime
+    ctx.obj['use_exiftool'] = use_exiftool
+    ctx.obj['max_concurrency'] = max_concurrency
 
 
 @cli.command()
 @click.argument('src_dir', type=click.Path(exists=True, path_type=Path))
 @click.option('-d', '--dst-dir', type=click.Path(path_type=Path), default=Path('.'), help='Destination directory')
+@click.option('--cache', is_flag=True, help=f'Cache datetime and hash in {CACHE_FILENAME} under the destination directory, so unchanged files are not parsed or hashed again')
+@click.option('--trust-names', is_flag=True, help='Take the hash from the name of files already organized in the destination directory instead of hashing them again')
 @click.pass_obj
-def organize(obj: dict, src_dir: Path, dst_dir: Path):
+def organize(obj: dict, src_dir: Path, dst_dir: Path, cache: bool, trust_names: bool):
     '''Organize photos/videos into folders'''
-    org = PhotoOrganizer(src_dir, dst_dir, obj['timezone'])
+    cache_path = None
+    if cache:
+        dst_dir.mkdir(parents=True, exist_ok=True)
+        cache_path = dst_dir / CACHE_FILENAME
+    org = PhotoOrganizer(src_dir, dst_dir, obj['timezone'], cache_path)
     org.allow_mtime = obj['allow_mtime']
-    org.start()
+    org.max_concurrency = obj['max_concurrency']
+    org.trust_names = trust_names
+    with start_exiftool(obj['use_exiftool']) as exiftool:
+        org.exiftool = exiftool
+        org.start()
 
 
 @cli.command()
 @click.argument('src_dir', type=click.Path(exists=True, path_type=Path))
 @click.option(
     '--datetime-source',
-    type=click.Choice(['EXIF', 'MediaInfo', 'mtime'], case_sensitive=False),
+    type=click.Choice(['EXIF', 'QuickTime', 'MediaInfo', 'mtime'], case_sensitive=False),
     multiple=True,
-    help='Filter by datetime_source (can be used multiple times)'
+    help='Filter by datetime_source (can be used multiple times). Videos are QuickTime, or MediaInfo if the built-in MP4/MOV reader cannot parse them'
 )
 @click.option('--only-errors', is_flag=True, default=False)
+@click.option('--cache-file', 'cache_path', type=click.Path(exists=True, dir_okay=False, path_type=Path), help=f'Take the datetime of unchanged files from a {CACHE_FILENAME} written by `organize --cache`, without modifying it')
 @click.pass_obj
-def analyze(obj: dict, src_dir: Path, datetime_source: tuple[str], only_errors: bool | None):
+def analyze(obj: dict, src_dir: Path, datetime_source: tuple[str], only_errors: bool | None, cache_path: Path | None):
     '''Analyze photos/videos for datetime'''
-    org = PhotoOrganizer(src_dir, Path('.'), obj['timezone'])
+    org = PhotoOrganizer(src_dir, Path('.'), obj['timezone'], cache_path, cache_readonly=True)
     org.allow_mtime = obj['allow_mtime']
-    completed, failed = tpe_submit(org.get_info, org.iter_photo())
+    try:
+        with start_exiftool(obj['use_exiftool']) as exiftool:
+            org.exiftool = exiftool
+            completed, failed = tpe_submit(org.get_info_cached, org.iter_photo(), max_workers=obj['max_concurrency'] or org.default_concurrency())
+    finally:
+        if org.cache:
+            org.cache.close()
     infos = (info for _, info in completed)
 
     # Apply filters
@@ -59,4 +99,6 @@ def analyze(obj: dict, src_dir: Path, datetime_source: tuple[str], only_errors:
     failed_infos = (PhotoInfo.no_datetime(p, repr(e)) for p, e in failed)
     infos = itertools.chain(infos, failed_infos)
 
-    click.echo_via_pager(tabulate(sorted(infos), headers=['path', 'datetime', 'datetime_source', 'errors']))
+    # Errors are a tuple in PhotoInfo, keep showing them as a list
+    rows = ((i.path, i.datetime, i.datetime_source, list(i.errors)) for i in sorted(infos, key=lambda info: info.path))
+    click.echo_via_pager(tabulate(rows, headers=['path', 'datetime', 'datetime_source', 'errors']))
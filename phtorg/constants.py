@@ -1,5 +1,7 @@
 # These constants control how the deterministic filename is computed.
-# Monkey-patch this module to get a different behaviour.
+# Monkey-patch this module to get a different behaviour. Large files are
+# hashed in worker processes that import the __main__ module again: in a
+# wrapper script, only run the CLI under `if __name__ == '__main__':`.
 
 # By default, a deterministic filename is:
 # {prefix}_{datetime}_{hash}{ext}
@@ -8,3 +10,21 @@
 
 DEFAULT_PREFIX = 'IMG_'
 DATETIME_FMT = '%Y%m%d_%H%M%S'
+
+# Algorithm of the Git-like hash in the filename. Any name accepted by
+# hashlib.new() works (e.g. 'blake2b'), as does 'blake3' (requires the `blake3`
+# package), which is several times faster on large files, or 'xxh3_64'
+# (requires the `xxhash` package). Changing it changes every filename,
+# so files that are already organized will be renamed again.
+HASH_ALGORITHM = 'sha1'
+
+# Hash only the first and last HASH_SAMPLE_SIZE bytes (plus the file size)
+# instead of the whole file, e.g. 4096. Reading a few KB instead of hundreds
+# of MB per video is much faster, but like HASH_ALGORITHM this changes the
+# filenames of all files larger than two samples. None hashes whole files.
+HASH_SAMPLE_SIZE: int | None = None
+
+# With HASH_SAMPLE_SIZE, also hash the last bytes of the file. Set to False to
+# hash only the first HASH_SAMPLE_SIZE bytes plus the file size: one read per
+# file, e.g. with HASH_SAMPLE_SIZE = 1 << 20. This changes filenames too.
+HASH_SAMPLE_TAIL = True
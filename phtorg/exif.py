@@ -0,0 +1,219 @@
+import os
+import struct
+from pathlib import Path
+from io import BufferedIOBase
+
+from phtorg.isobmff import iter_boxes
+from phtorg.isobmff import read_box_header
+
+
+EXIF_IFD_POINTER = 0x8769
+
+# Tag IDs of the datetime and offset tags, which are all ASCII
+DATETIME = 0x0132
+DATETIME_ORIGINAL = 0x9003
+DATETIME_DIGITIZED = 0x9004
+OFFSET_TIME = 0x9010
+OFFSET_TIME_ORIGINAL = 0x9011
+OFFSET_TIME_DIGITIZED = 0x9012
+DATETIME_TAGS = frozenset({
+    DATETIME, DATETIME_ORIGINAL, DATETIME_DIGITIZED,
+    OFFSET_TIME, OFFSET_TIME_ORIGINAL, OFFSET_TIME_DIGITIZED,
+})
+
+_TYPE_ASCII = 2
+_TYPE_LONG = 4
+_TYPE_IFD = 13
+
+
+def parse_tiff(data: bytes) -> dict[int, str | None]:
+    '''Collect the tags of IFD0 and the Exif IFD from a TIFF structure.
+
+    Only the values of DATETIME_TAGS are decoded (the same way as Pillow
+    does); other tags map to None. Tags in the Exif IFD take precedence over
+    those in IFD0.
+    '''
+    byte_order = {b'II': '<', b'MM': '>'}.get(data[:2])
+    if byte_order is None or struct.unpack_from(f'{byte_order}H', data, 2)[0] != 42:
+        raise ValueError('Invalid TIFF header')
+    tags: dict[int, str | None] = {}
+    ifd0_offset, = struct.unpack_from(f'{byte_order}I', data, 4)
+    exif_ifd_offset = _read_ifd(data, byte_order, ifd0_offset, tags)
+    if exif_ifd_offset:
+        _read_ifd(data, byte_order, exif_ifd_offset, tags)
+    return tags
+
+
+def _read_ifd(data: bytes, byte_order: str, offset: int, tags: dict[int, str | None]) -> int | None:
+    '''Add the tags of one IFD to `tags` and return the Exif IFD offset, if any'''
+    exif_ifd_offset = None
+    count, = struct.unpack_from(f'{byte_order}H', data, offset)
+    if offset + 2 + count * 12 > len(data):
+        raise ValueError('IFD runs past the end of the TIFF data')
+    for i in range(count):
+        tag, type_, n, value = struct.unpack_from(f'{byte_order}HHI4s', data, offset + 2 + i * 12)
+        if tag == EXIF_IFD_POINTER and type_ in (_TYPE_LONG, _TYPE_IFD):
+            # A single offset fits in the entry, anything else is corrupted
+            if n != 1:
+                raise ValueError('Invalid Exif IFD pointer')
+            exif_ifd_offset, = struct.unpack(f'{byte_order}I', value)
+            tags[tag] = None
+        elif type_ == _TYPE_ASCII and tag in DATETIME_TAGS and n > 0:
+            # Values of up to 4 bytes are stored in the entry itself
+            if n <= 4:
+                raw = value[:n]
+            else:
+                start, = struct.unpack(f'{byte_order}I', value)
+                # Slicing would silently truncate a corrupted value
+                if start + n > len(data):
+                    raise ValueError('Tag value runs past the end of the TIFF data')
+                raw = data[start:start + n]
+            tags[tag] = raw.removesuffix(b'\0').decode('latin-1', 'replace')
+        else:
+            tags[tag] = None
+    return exif_ifd_offset
+
+
+def read_jpeg_exif(path: Path) -> dict[int, str | None]:
+    '''Read EXIF tags from the APP1 segment of a JPEG file.
+
+    Only the segment headers before the image data are read; the image is
+    never decoded. Returns an empty dict if there is no EXIF. Raises
+    ValueError or struct.error on anything unexpected, so that the caller can
+    fall back to Pillow.
+    '''
+    with open(path, 'rb') as f:
+        return read_jpeg_exif_fileobj(f)
+
+
+def read_jpeg_exif_fileobj(f: BufferedIOBase) -> dict[int, str | None]:
+    '''Same as read_jpeg_exif(), but on a file opened in binary mode'''
+    f.seek(0)
+    if f.read(2) != b'\xff\xd8':
+        raise ValueError('Not a JPEG file')
+    while True:
+        header = f.read(4)
+        if len(header) < 4 or header[0] != 0xFF:
+            raise ValueError('Invalid JPEG segment')
+        marker = header[1]
+        # Start of scan: image data follows, no more metadata
+        if marker == 0xDA:
+            return {}
+        length, = struct.unpack('>H', header[2:])
+        if marker == 0xE1:
+            segment = f.read(length - 2)
+            if segment.startswith(b'Exif\0\0'):
+                return parse_tiff(segment[6:])
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_heif_exif(path: Path) -> dict[int, str | None]:
+    '''Read EXIF tags from the Exif item of a HEIF (HEIC) file.
+
+    Only the `meta` box and the Exif item are read; libheif is never
+    involved. Returns an empty dict if there is no EXIF. Raises ValueError or
+    struct.error on anything unexpected, like read_jpeg_exif().
+    '''
+    with open(path, 'rb') as f:
+        return read_heif_exif_fileobj(f)
+
+
+def read_heif_exif_fileobj(f: BufferedIOBase) -> dict[int, str | None]:
+    '''Same as read_heif_exif(), but on a file opened in binary mode'''
+    f.seek(0)
+    meta = None
+    while meta is None:
+        box_type, size = read_box_header(f)
+        if box_type == b'meta':
+            meta = f.read(size)
+        elif size < 0:
+            raise ValueError('No meta box')
+        else:
+            f.seek(size, os.SEEK_CUR)
+
+    # meta is a FullBox: skip version and flags
+    boxes = dict(iter_boxes(meta, 4))
+    if b'iinf' not in boxes or b'iloc' not in boxes:
+        raise ValueError('No iinf or iloc box')
+    exif_item_id = _find_exif_item(boxes[b'iinf'])
+    if exif_item_id is None:
+        return {}
+    extents = _find_item_extents(boxes[b'iloc'], exif_item_id)
+    data = bytearray()
+    for offset, length in extents:
+        f.seek(offset)
+        data += f.read(length)
+    # The item starts with the offset of the TIFF header after this field
+    tiff_header_offset, = struct.unpack_from('>I', data)
+    return parse_tiff(bytes(data[4 + tiff_header_offset:]))
+
+
+def _find_exif_item(iinf: bytes) -> int | None:
+    '''Return the ID of the Exif item in an `iinf` box, if any'''
+    version, = struct.unpack_from('>B', iinf)
+    offset = 6 if version == 0 else 8
+    for box_type, infe in iter_boxes(iinf, offset):
+        if box_type != b'infe':
+            continue
+        infe_version, = struct.unpack_from('>B', infe)
+        # Item types only exist in `infe` version 2 and later
+        if infe_version < 2:
+            continue
+        if infe_version == 2:
+            item_id, _, item_type = struct.unpack_from('>HH4s', infe, 4)
+        else:
+            item_id, _, item_type = struct.unpack_from('>IH4s', infe, 4)
+        if item_type == b'Exif':
+            return item_id
+    return None
+
+
+def _find_item_extents(iloc: bytes, item_id: int) -> list[tuple[int, int]]:
+    '''Return the (file offset, length) extents of an item from an `iloc` box'''
+    version, sizes, more_sizes = struct.unpack_from('>B3xBB', iloc)
+    offset_size = sizes >> 4
+    length_size = sizes & 0xF
+    base_offset_size = more_sizes >> 4
+    index_size = more_sizes & 0xF if version in (1, 2) else 0
+    pos = 6
+
+    def read_uint(size: int) -> int:
+        nonlocal pos
+        value = int.from_bytes(iloc[pos:pos + size], 'big')
+        pos += size
+        return value
+
+    item_count = read_uint(2 if version < 2 else 4)
+    for _ in range(item_count):
+        current_id = read_uint(2 if version < 2 else 4)
+        construction_method = read_uint(2) & 0xF if version in (1, 2) else 0
+        read_uint(2)  # data_reference_index
+        base_offset = read_uint(base_offset_size)
+        extents = []
+        for _ in range(read_uint(2)):
+            read_uint(index_size)
+            extents.append((base_offset + read_uint(offset_size), read_uint(length_size)))
+        if current_id == item_id:
+            # Items stored in the `idat` box or in other items are rare for Exif
+            if construction_method != 0:
+                raise ValueError('Unsupported iloc construction method')
+            return extents
+    raise ValueError('Exif item has no location')
+
+
+def read_exif_fileobj(f: BufferedIOBase) -> dict[int, str | None]:
+    '''Read EXIF tags from a JPEG or HEIF file, told apart by their magic bytes'''
+    f.seek(0)
+    head = f.read(12)
+    if head.startswith(b'\xff\xd8'):
+        return read_jpeg_exif_fileobj(f)
+    if head[4:8] == b'ftyp':
+        return read_heif_exif_fileobj(f)
+    raise ValueError('Neither a JPEG nor a HEIF file')
+
+
+def read_exif(path: Path) -> dict[int, str | None]:
+    '''Same as read_exif_fileobj(), but on a path'''
+    with open(path, 'rb') as f:
+        return read_exif_fileobj(f)
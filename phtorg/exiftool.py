@@ -0,0 +1,63 @@
+import json
+import contextlib
+import threading
+import subprocess
+from pathlib import Path
+from collections.abc import Iterable
+
+
+class ExifTool:
+    '''A long-running `exiftool -stay_open` process shared by worker threads.
+
+    Starting exiftool (a Perl program) takes far longer than reading the tags
+    of a file, so one process is kept around and fed filenames on stdin.
+    '''
+
+    def __init__(self, executable: str = 'exiftool') -> None:
+        self.process = subprocess.Popen(
+            [executable, '-stay_open', 'True', '-@', '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+        )
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> 'ExifTool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get_tags(self, path: Path, tags: Iterable[str]) -> dict:
+        '''Return the requested tags of a file, keyed by tag name without group'''
+        assert self.process.stdin is not None
+        assert self.process.stdout is not None
+        args = ['-json', *(f'-{tag}' for tag in tags), str(path), '-execute']
+        with self.lock:
+            self.process.stdin.write('\n'.join(args) + '\n')
+            self.process.stdin.flush()
+            lines = []
+            while (line := self.process.stdout.readline()) and line.strip() != '{ready}':
+                lines.append(line)
+        if not line:
+            raise OSError('exiftool exited unexpectedly')
+        output = ''.join(lines).strip()
+        # Nothing is printed if the file has none of the tags
+        result = json.loads(output)[0] if output else {}
+        if 'Error' in result:
+            raise ValueError(result['Error'])
+        return result
+
+    def close(self) -> None:
+        assert self.process.stdin is not None
+        with self.lock:
+            # exiftool may have died already, e.g. killed along with a Ctrl-C:
+            # closing must not raise from __exit__ and hide the original error
+            with contextlib.suppress(OSError):
+                if self.process.poll() is None:
+                    self.process.stdin.write('-stay_open\nFalse\n')
+                    self.process.stdin.flush()
+                self.process.stdin.close()
+            self.process.wait()
@@ -0,0 +1,119 @@
+import os
+import mmap
+import hashlib
+import threading
+from pathlib import Path
+from io import BufferedIOBase
+
+
+# Buffer for the samples, reused across files by each thread
+_local = threading.local()
+
+# Whole files larger than this are evicted from the page cache after hashing
+_DROP_CACHE_SIZE = 4 * 1024 * 1024
+
+
+def new_hash(algorithm: str):
+    '''Create a hash object by name.
+
+    "blake3" requires the `blake3` package, and "xxh3_64", "xxh3_128" etc.
+    the `xxhash` package. Anything else is passed to hashlib.
+    '''
+    if algorithm == 'blake3':
+        import blake3
+        # Let BLAKE3 spread a single large file across cores with its tree hashing
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    if algorithm.startswith('xxh'):
+        import xxhash
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+
+def hash_method(algorithm: str, sample_size: int | None, sample_tail: bool = True) -> str:
+    '''Describe how hash_file() computes a hash, e.g. for cache keys'''
+    if sample_size is None:
+        return algorithm
+    if not sample_tail:
+        return f'{algorithm}:head={sample_size}'
+    return f'{algorithm}:sample={sample_size}'
+
+
+def _read_into_buffer(f: BufferedIOBase, size: int) -> memoryview:
+    '''Read up to `size` bytes into this thread's buffer, without allocating'''
+    buf = getattr(_local, 'buf', None)
+    if buf is None or len(buf) < size:
+        buf = _local.buf = bytearray(size)
+    n = f.readinto(memoryview(buf)[:size])
+    return memoryview(buf)[:n]
+
+
+def head_digest(path: Path, size: int = 64 * 1024) -> bytes:
+    '''Digest of the first `size` bytes of a file, to tell files apart cheaply'''
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(size)).digest()
+
+
+def hash_file(path: Path, algorithm: str = 'sha1', sample_size: int | None = None, sample_tail: bool = True) -> str:
+    '''Generate a Git-like hash (first 7 chars of the digest) of a file.
+
+    If `sample_size` is given and the file is larger than two samples, only
+    the first and last `sample_size` bytes plus the file size are hashed.
+    Without `sample_tail`, only the first `sample_size` bytes plus the file
+    size are, if the file is larger than one sample.
+
+    This is a top-level function so that it can be pickled into a process pool.
+    '''
+    if algorithm == 'blake3' and sample_size is None:
+        hash_obj = new_hash(algorithm)
+        # Let blake3 map the file itself and hash it with its thread pool
+        if hasattr(hash_obj, 'update_mmap'):
+            return hash_obj.update_mmap(path).hexdigest()[:7]
+    with open(path, 'rb') as f:
+        return hash_fileobj(f, algorithm, sample_size, sample_tail)
+
+
+def hash_fileobj(f: BufferedIOBase, algorithm: str = 'sha1', sample_size: int | None = None, sample_tail: bool = True) -> str:
+    '''Same as hash_file(), but on a file opened in binary mode at any position'''
+    hash_obj = new_hash(algorithm)
+    size = os.fstat(f.fileno()).st_size
+    if sample_size is not None and not sample_tail and size > sample_size:
+        f.seek(0)
+        hash_obj.update(_read_into_buffer(f, sample_size))
+        hash_obj.update(size.to_bytes(8, 'little'))
+    elif sample_size is not None and sample_tail and size > 2 * sample_size:
+        # Keep the kernel from reading ahead past the samples, and drop the
+        # pages afterwards: nothing else reads this file in the meantime
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_RANDOM)
+            # Queue both reads at once, so that the device serves them
+            # together instead of the tail waiting for the head
+            os.posix_fadvise(f.fileno(), 0, sample_size, os.POSIX_FADV_WILLNEED)
+            os.posix_fadvise(f.fileno(), size - sample_size, sample_size, os.POSIX_FADV_WILLNEED)
+        f.seek(0)
+        hash_obj.update(_read_into_buffer(f, sample_size))
+        f.seek(-sample_size, os.SEEK_END)
+        hash_obj.update(_read_into_buffer(f, sample_size))
+        hash_obj.update(size.to_bytes(8, 'little'))
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    # An empty file cannot be mapped, and its digest is that of no data
+    elif size:
+        try:
+            mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Some filesystems (e.g. certain FUSE and network mounts) cannot be
+            # mapped: let hashlib stream the file in C instead of a Python loop
+            f.seek(0)
+            hash_obj = hashlib.file_digest(f, lambda: new_hash(algorithm))
+        else:
+            # Hash the mapping in one call: no per-chunk copies into Python
+            # bytes objects, and the GIL is released for the whole file
+            with mm:
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                hash_obj.update(mm)
+            # Large files (videos) are read once and would only push other
+            # pages out of the page cache: drop them right away
+            if size > _DROP_CACHE_SIZE and hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return hash_obj.hexdigest()[:7]
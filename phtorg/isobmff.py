@@ -0,0 +1,35 @@
+import struct
+from io import BufferedIOBase
+
+
+# Boxes (atoms) of ISO base media files: HEIF, MP4 and QuickTime MOV
+
+
+def read_box_header(f: BufferedIOBase) -> tuple[bytes, int]:
+    '''Read an ISOBMFF box header and return (type, size of the body), -1 if until EOF'''
+    header = f.read(8)
+    if len(header) < 8:
+        raise ValueError('Truncated box')
+    size, box_type = struct.unpack('>I4s', header)
+    if size == 1:
+        size, = struct.unpack('>Q', f.read(8))
+        return box_type, size - 16
+    if size == 0:
+        return box_type, -1
+    return box_type, size - 8
+
+
+def iter_boxes(data: bytes, offset: int = 0):
+    '''Yield (type, body) of the boxes in `data`'''
+    while offset + 8 <= len(data):
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if size == 1:
+            size, = struct.unpack_from('>Q', data, offset + 8)
+            header_size = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header_size:
+            raise ValueError('Invalid box size')
+        yield box_type, data[offset + header_size:offset + size]
+        offset += size
@@ -1,39 +1,201 @@
 #!/usr/bin/env python
 
+import os
 import re
-import io
 import csv
-import hashlib
+import struct
+import filecmp
 import logging
+import functools
 import dataclasses
+import multiprocessing
+import concurrent.futures
 from pathlib import Path
+from collections import ChainMap
+from collections import defaultdict
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from zoneinfo import ZoneInfo
+from collections.abc import Callable
 from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from collections.abc import Sequence
+from typing import TypeVar
 
-import pytz
 import click
-from tqdm import tqdm
 from PIL import Image
-from PIL import ExifTags
+from PIL import UnidentifiedImageError
 from pillow_heif import register_heif_opener
 from pymediainfo import MediaInfo
-from tabulate import tabulate
-from dateutil.parser import isoparse
 
+try:
+    from wcwidth import wcswidth  # type: ignore[import-untyped]
+except ImportError:
+    wcswidth = None
+
+from phtorg import exif
 from phtorg import constants
 from phtorg.tpe import tpe_submit
+from phtorg.exif import read_exif
+from phtorg.exif import read_exif_fileobj
+from phtorg.cache import InfoCache
+from phtorg.exiftool import ExifTool
+from phtorg.hashing import hash_file
+from phtorg.hashing import hash_fileobj
+from phtorg.hashing import head_digest
+from phtorg.hashing import hash_method
+from phtorg.rename import rename_noreplace
+from phtorg.quicktime import read_creation_date
 
 
 register_heif_opener()
 log = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+
+def parse_exif_datetime(dt_str: str) -> datetime:
+    '''Parse an EXIF datetime like "2018:12:25 18:19:37" into a naive datetime.
+
+    The format is fixed, so the fields are sliced out directly instead of
+    going through a general-purpose parser.
+    '''
+    # Some software appends non-ASCII bytes like '下午'
+    # 'DateTime': '2018:12:25 18:19:37ä¸\x8bå\x8d\x88'
+    if len(dt_str) < 19:
+        raise ValueError(f'Invalid EXIF datetime: {dt_str!r}')
+    return datetime(
+        int(dt_str[0:4]), int(dt_str[5:7]), int(dt_str[8:10]),
+        int(dt_str[11:13]), int(dt_str[14:16]), int(dt_str[17:19]),
+    )
+
+
+def first_str(_exif: Mapping[int, object], *tags: int) -> str | None:
+    '''Return the first non-empty string value among `tags`'''
+    for tag in tags:
+        if isinstance(value := _exif.get(tag), str) and value:
+            return value
+    return None
+
+
+def parse_exif_offset(offset_str: str) -> timezone:
+    '''Parse an EXIF offset like "+01:00" or "-01:00" into a fixed timezone'''
+    offset = timedelta(hours=int(offset_str[1:3]), minutes=int(offset_str[4:6]))
+    return timezone(-offset if offset_str[0] == '-' else offset)
+
+
+# What parse_exif_offset() expects at the start of an EXIF offset
+EXIF_OFFSET_RE = re.compile(r'[+-]\d\d:\d\d')
+
+
+# exiftool names of the EXIF tags we read, and their tag IDs
+EXIFTOOL_TAGS = {
+    'DateTimeOriginal': exif.DATETIME_ORIGINAL,
+    'CreateDate': exif.DATETIME_DIGITIZED,
+    'ModifyDate': exif.DATETIME,
+    'OffsetTimeOriginal': exif.OFFSET_TIME_ORIGINAL,
+    'OffsetTimeDigitized': exif.OFFSET_TIME_DIGITIZED,
+    'OffsetTime': exif.OFFSET_TIME,
+}
+
+
+def hash_params() -> tuple[str, int | None, bool]:
+    '''Arguments of hash_file() from the constants, read at call time.
+
+    Pass them explicitly to the process pool: spawned workers don't see
+    monkey-patches.
+    '''
+    return constants.HASH_ALGORITHM, constants.HASH_SAMPLE_SIZE, constants.HASH_SAMPLE_TAIL
+
+
+def read_exif_and_hash(photo: Path, algorithm: str, sample_size: int | None, sample_tail: bool = True) -> tuple[dict | None, str]:
+    '''Read EXIF from a JPEG/HEIF file and hash it, opening the file only once.
+
+    EXIF is None if the file is not a well-formed JPEG/HEIF. This is a
+    top-level function so that it can be pickled into a process pool.
+    '''
+    with open(photo, 'rb') as f:
+        try:
+            tags = read_exif_fileobj(f)
+        except (ValueError, struct.error):
+            tags = None
+        h = hash_fileobj(f, algorithm, sample_size, sample_tail)
+    return tags, h
+
+
+@functools.cache
+def mediainfo_library_file() -> str | None:
+    '''Path of the libmediainfo that pymediainfo loads, or None if it cannot be found.
+
+    MediaInfo.parse() searches for the library and loads it again on every
+    call; passing the path it found the first time skips the search.
+    '''
+    # _get_library() is private: if another pymediainfo version changes it in
+    # any way, let MediaInfo.parse() search for the library as usual
+    try:
+        lib, *_ = MediaInfo._get_library()
+        name = lib._name
+    except Exception:
+        return None
+    return name if isinstance(name, str) else None
+
+
+def is_rotational(path: Path) -> bool | None:
+    '''Tell whether `path` is on a spinning disk, or None if unknown (non-Linux, network filesystems, etc.)'''
+    st_dev = path.stat().st_dev
+    block = Path(f'/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}')
+    # A partition has no queue of its own: it is on its parent device
+    for rotational in (block / 'queue/rotational', block / '../queue/rotational'):
+        try:
+            return rotational.read_text().strip() == '1'
+        except OSError:
+            continue
+    return None
+
+
+def text_width(s: str) -> int:
+    '''Width of `s` on a terminal, like tabulate() measures it: with wcwidth if it is installed'''
+    return len(s) if wcswidth is None else wcswidth(s)
+
+
+def iter_table(records: Sequence, headers: list[str]) -> Iterator[str]:
+    '''Lines of tabulate(disable_numparse=True) over the row() of `records`, without building the whole table in memory.
+
+    One pass sizes the columns, then each record is laid out on its own.
+    Like tabulate() does for strings, cells are stripped, left-aligned and
+    split into lines, and numeric-looking ones are left as they are.
+    '''
+    def cell_lines(values: Iterable[str | None]) -> list[list[str]]:
+        return [(v or '').strip().split('\n') for v in values]
+
+    def pad(line: str, width: int) -> str:
+        return line + ' ' * (width - text_width(line))
+
+    def layout(cells: list[list[str]], widths: list[int]) -> Iterator[str]:
+        # A row is as high as its cell with the most lines
+        for i in range(max(map(len, cells))):
+            yield '  '.join(pad(lines[i] if i < len(lines) else '', w) for lines, w in zip(cells, widths)).rstrip() + '\n'
+
+    header_cells = cell_lines(headers)
+    widths = [max(map(text_width, lines)) + 2 for lines in header_cells]
+    for r in records:
+        widths = [max(w, *map(text_width, lines)) for w, lines in zip(widths, cell_lines(r.row()))]
+    yield from layout(header_cells, widths)
+    yield '  '.join('-' * w for w in widths) + '\n'
+    for r in records:
+        yield from layout(cell_lines(r.row()), widths)
+
 
-@dataclasses.dataclass(order=True)
+@dataclasses.dataclass(order=True, slots=True)
 class PhotoInfo:
     path: Path
     datetime: datetime | None
     datetime_source: str | None
-    errors: list[str] = dataclasses.field(default_factory=list)
+    # Most files have none: share one empty tuple instead of a new list each,
+    # and don't take part in the ordering
+    errors: tuple[str, ...] = dataclasses.field(default=(), compare=False)
 
     def __repr__(self) -> str:
         return f'{self.path} @ {self.datetime} ({self.datetime_source})'
@@ -42,18 +204,16 @@ class PhotoInfo:
     def header() -> list[str]:
         return ['src', 'errors']
 
-    def row(self) -> dict:
-        return {
-            'src': str(self.path),
-            'errors': '; '.join(self.errors),
-        }
+    def row(self) -> tuple[str, ...]:
+        '''Values in the order of header()'''
+        return (str(self.path), '; '.join(self.errors))
 
     @classmethod
     def no_datetime(cls, path: Path, error: str):
-        return cls(path, None, None, [error])
+        return cls(path, None, None, (error,))
 
 
-@dataclasses.dataclass(order=True)
+@dataclasses.dataclass(order=True, slots=True)
 class RenameTask:
     photo_info: PhotoInfo
     destination: Path
@@ -65,93 +225,185 @@ class RenameTask:
     def header() -> list[str]:
         return ['src', 'datetime', 'datetime_source', 'dst']
 
-    def row(self) -> dict:
-        return {
-            'src': str(self.photo_info.path),
-            'datetime': str(self.photo_info.datetime),
-            'datetime_source': self.photo_info.datetime_source,
-            'dst': str(self.destination),
-        }
+    def row(self) -> tuple[str | None, ...]:
+        '''Values in the order of header()'''
+        info = self.photo_info
+        return (str(info.path), str(info.datetime), info.datetime_source, str(self.destination))
 
 
 class PhotoOrganizer:
 
-    pillow_exts = {'.jpg', '.jpeg', '.heic'}
-    mediainfo_exts = {'.mov', '.mp4', '.m4v'}
-    screenshot_exts = {'.png', '.gif', '.bmp', '.webp'}
+    jpeg_exts = frozenset({'.jpg', '.jpeg'})
+    heif_exts = frozenset({'.heic'})
+    pillow_exts = jpeg_exts | heif_exts
+    # Pillow formats of pillow_exts, so that Pillow doesn't probe every plugin
+    pillow_formats = ('JPEG', 'HEIF')
+    mediainfo_exts = frozenset({'.mov', '.mp4', '.m4v'})
+    screenshot_exts = frozenset({'.png', '.gif', '.bmp', '.webp'})
     allowed_exts = pillow_exts | mediainfo_exts | screenshot_exts
     allow_mtime = False
-
-    def __init__(self, src_dir: Path, dst_dir: Path, timezone_name: str) -> None:
+    exiftool: ExifTool | None = None
+    # Files smaller than this are hashed in the calling thread: the round trip
+    # to the process pool would cost more than the hash itself
+    inline_hash_size = 1024 * 1024
+    # Number of worker threads; None picks one based on the source disk
+    max_concurrency: int | None = None
+    # Take the hash from the name of files that are already organized
+    trust_names = False
+
+    def __init__(self, src_dir: Path, dst_dir: Path, timezone_name: str, cache_path: Path | None = None, cache_readonly: bool = False) -> None:
         self.src_dir = src_dir
         self.dst_dir = dst_dir
         self.rename_tasks: list[RenameTask] = []
         self.skipped_items: list[PhotoInfo] = []
-        self.timezone = pytz.timezone(timezone_name)
+        # (destination of the original, duplicate) of copies to delete once
+        # their original is organized
+        self.duplicates: list[tuple[Path, Path]] = []
+        self.timezone = ZoneInfo(timezone_name)
+        self.cache = InfoCache(cache_path, cache_readonly) if cache_path else None
+        self._hash_executor: concurrent.futures.Executor | None = None
+        # One lookup per file instead of testing the extension sets in turn
+        self._info_getters: dict[str, Callable[[Path, dict | None], PhotoInfo]] = {
+            **dict.fromkeys(self.pillow_exts, self._get_info_from_image),
+            **dict.fromkeys(self.mediainfo_exts, self._get_info_from_video),
+            **dict.fromkeys(self.screenshot_exts, self._get_info_from_screenshot),
+        }
 
-    def get_info(self, photo: Path) -> PhotoInfo:
-        ext = photo.suffix.lower()
-        if ext in self.pillow_exts:
-            info = self.get_info_from_pillow(photo)
-        elif ext in self.mediainfo_exts:
-            info = self.get_info_from_mediainfo(photo)
-        elif ext in self.screenshot_exts:
-            info = PhotoInfo.no_datetime(photo, 'Datetime extraction is skipped for this type of file')
-        else:
-            raise RuntimeError(f'Unexpected extension: {photo}')
+    def get_info(self, photo: Path, st: os.stat_result | None = None, embedded_exif: dict | None = None, ext: str | None = None) -> PhotoInfo:
+        '''Get the datetime of a file. `st` and `ext` (lowercase suffix) can be passed if already known.'''
+        ext = ext or photo.suffix.lower()
+        try:
+            getter = self._info_getters[ext]
+        except KeyError:
+            raise RuntimeError(f'Unexpected extension: {photo}') from None
+        info = getter(photo, embedded_exif)
 
         if info.datetime is None:
             if self.allow_mtime:
-                info = self.get_info_from_file(info.path)
+                info = self.get_info_from_file(info.path, st)
             else:
                 raise Exception('Cannot determine datetime from EXIF/MediaInfo. Fallback to mtime is not allowed.')
         else:
             # Validate timezone
             tzinfo = info.datetime.tzinfo
             assert tzinfo is not None, 'timezone does not exist'
-            assert str(tzinfo) == str(self.timezone), 'timezone does not match'
+            # Every getter attaches self.timezone itself, and ZoneInfo instances
+            # are cached per key, so there is no need to compare names
+            assert tzinfo is self.timezone, 'timezone does not match'
 
         return info
 
+    def get_info_cached(self, photo: Path) -> PhotoInfo:
+        '''Same as get_info(), but take the datetime from the cache if the file has not changed'''
+        # The stat() is only needed for the cache key
+        if not self.cache:
+            return self.get_info(photo)
+        st = photo.stat()
+        if cached := self.cache.get_info(photo, st, self.timezone.key):
+            dt, datetime_source = cached
+            # mtime may have been allowed in the run that filled the cache
+            if datetime_source != 'mtime' or self.allow_mtime:
+                return PhotoInfo(photo, dt.replace(tzinfo=self.timezone), datetime_source)
+        return self.get_info(photo, st)
+
+    def _get_info_from_image(self, photo: Path, embedded_exif: dict | None) -> PhotoInfo:
+        if self.exiftool:
+            return self.get_info_from_exiftool(photo)
+        return self.get_info_from_embedded_exif(photo, embedded_exif)
+
+    def _get_info_from_video(self, photo: Path, _: dict | None) -> PhotoInfo:
+        return self.get_info_from_quicktime(photo)
+
+    @staticmethod
+    def _get_info_from_screenshot(photo: Path, _: dict | None) -> PhotoInfo:
+        return PhotoInfo.no_datetime(photo, 'Datetime extraction is skipped for this type of file')
+
     def iter_photo(self) -> Iterable[Path]:
         if self.src_dir.is_file():
             yield self.src_dir
-        else:
-            for p in self.src_dir.rglob('*.*'):
-                if p.suffix.lower() in self.allowed_exts:
-                    yield p
+            return
+
+        # Walk with os.scandir and filter on the entry name, so that a Path is
+        # only created for files we actually process. Like rglob, don't
+        # descend into symlinked directories, and skip unreadable ones.
+        stack = [self.src_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                it = os.scandir(directory)
+            except PermissionError:
+                log.warning(f'Skipping unreadable directory: {directory}')
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif os.path.splitext(entry.name)[1].lower() in self.allowed_exts and entry.is_file():
+                        yield Path(entry.path)
 
     def parse_timestamp(self, ts: int | float) -> datetime:
         '''Parse Unix timestamp into an aware datetime'''
         return datetime.fromtimestamp(ts, tz=self.timezone)
 
-    def get_info_from_file(self, photo: Path) -> PhotoInfo:
-        dt = self.parse_timestamp(photo.stat().st_mtime)
+    def get_info_from_file(self, photo: Path, st: os.stat_result | None = None) -> PhotoInfo:
+        '''Get datetime from mtime. Pass `st` to reuse an earlier stat() of the file'''
+        st = st or photo.stat()
+        dt = self.parse_timestamp(st.st_mtime)
         return PhotoInfo(photo, dt, 'mtime')
 
-    def get_info_from_pillow(self, photo: Path) -> PhotoInfo:
-        image = Image.open(photo)
-        _exif1 = image.getexif()
-        _exif2 = _exif1.get_ifd(0x8769)
-        _exif = dict(_exif1) | _exif2
-        exif = {
-            ExifTags.TAGS[k]: v
-            for k, v in _exif.items()
-            if k in ExifTags.TAGS and type(v) is not bytes
-        }
+    def get_info_from_embedded_exif(self, photo: Path, _exif: dict | None = None) -> PhotoInfo:
+        '''Read EXIF from the JPEG segments or HEIF boxes directly, without Pillow opening the image.
+
+        This also skips initializing libheif for HEIC files. Pass `_exif` if
+        it has already been read, e.g. by read_exif_and_hash().
+        '''
+        if _exif is None:
+            try:
+                _exif = read_exif(photo)
+            except (ValueError, struct.error):
+                # Not a well-formed JPEG/HEIF, or a layout we don't handle, let Pillow figure it out
+                return self.get_info_from_pillow(photo)
+        return self._get_info_from_exif(photo, _exif)
+
+    def get_info_from_exiftool(self, photo: Path) -> PhotoInfo:
+        '''Read EXIF through the long-running exiftool process'''
+        assert self.exiftool is not None
+        try:
+            tags = self.exiftool.get_tags(photo, (f'EXIF:{name}' for name in EXIFTOOL_TAGS))
+            _exif = {tag_id: tags[name] for name, tag_id in EXIFTOOL_TAGS.items() if isinstance(tags.get(name), str)}
+            return self._get_info_from_exif(photo, _exif)
+        except (OSError, ValueError):
+            # exiftool died or returned something unparsable, use our own readers
+            return self.get_info_from_embedded_exif(photo)
 
+    def get_info_from_pillow(self, photo: Path) -> PhotoInfo:
+        try:
+            image = Image.open(photo, formats=self.pillow_formats)
+        except UnidentifiedImageError:
+            # Not what the extension says, e.g. a PNG named .jpg
+            image = Image.open(photo)
+        # Close the file and release libheif buffers right away, instead of
+        # leaving it to the garbage collector
+        with image:
+            _exif1 = image.getexif()
+            _exif2 = _exif1.get_ifd(exif.EXIF_IFD_POINTER)
+        # Exif IFD first, like the merged dict of read_exif(), without copying
+        return self._get_info_from_exif(photo, ChainMap(_exif2, _exif1))
+
+    def _get_info_from_exif(self, photo: Path, _exif: Mapping[int, object]) -> PhotoInfo:
         # No EXIF at all
-        if not exif:
+        if not _exif:
             return PhotoInfo.no_datetime(photo, 'File is EXIF-compatible but no EXIF found')
 
         # Extract datetime and offset from EXIF
         # EXIF 2.31 (July 2016) introduced "OffsetTime", "OffsetTimeOriginal" and "OffsetTimeDigitized".
         # They are formatted as seven ASCII characters (including the null terminator) denoting
         # the hours and minutes of the offset, like +01:00 or -01:00.
-        _exif_dt = exif.get('DateTimeOriginal') or exif.get('DateTimeDigitized') or exif.get('DateTime')
-        _exif_time_offset = exif.get('OffsetTimeOriginal') or exif.get('OffsetTimeDigitized') or exif.get('OffsetTime')
+        # Look the few tags up by ID, instead of translating every tag to its name.
+        _exif_dt = first_str(_exif, exif.DATETIME_ORIGINAL, exif.DATETIME_DIGITIZED, exif.DATETIME)
+        _exif_time_offset = first_str(_exif, exif.OFFSET_TIME_ORIGINAL, exif.OFFSET_TIME_DIGITIZED, exif.OFFSET_TIME)
         # If not conform to standard, treat it as garbage.
-        if _exif_time_offset is not None and not re.match(r'[+-]\d\d\:\d\d', _exif_time_offset):
+        if _exif_time_offset is not None and not EXIF_OFFSET_RE.match(_exif_time_offset):
             _exif_time_offset = ''
 
         # No datetime in EXIF
@@ -159,26 +411,36 @@ class PhotoOrganizer:
             return PhotoInfo.no_datetime(photo, 'EXIF exists but no datetime found')
 
         # Parse datetime string
-        # Some software appends non-ASCII bytes like '下午'
-        # 'DateTime': '2018:12:25 18:19:37ä¸\x8bå\x8d\x88'
-        dt_str = _exif_dt[:19].replace(':', '-', 2)
+        dt = parse_exif_datetime(_exif_dt)
         if _exif_time_offset:
-            dt_str += _exif_time_offset
-            dt = isoparse(dt_str).astimezone(self.timezone)
+            dt = dt.replace(tzinfo=parse_exif_offset(_exif_time_offset)).astimezone(self.timezone)
         else:
-            dt = self.timezone.localize(isoparse(dt_str))
+            dt = dt.replace(tzinfo=self.timezone)
         return PhotoInfo(photo, dt, 'EXIF')
 
+    def get_info_from_quicktime(self, photo: Path) -> PhotoInfo:
+        '''Read the creation datetime from the `moov` box directly, without loading libmediainfo'''
+        try:
+            dt = read_creation_date(photo)
+        except (ValueError, struct.error):
+            # Not a well-formed MP4/MOV, or a layout we don't handle, let MediaInfo figure it out
+            return self.get_info_from_mediainfo(photo)
+        if dt is None:
+            return PhotoInfo.no_datetime(photo, 'Cannot extract datetime from QuickTime metadata')
+        return PhotoInfo(photo, dt.astimezone(self.timezone), 'QuickTime')
+
     def get_info_from_mediainfo(self, photo: Path) -> PhotoInfo:
-        mediainfo = MediaInfo.parse(photo)
+        # Only the general track's tags from the container header are needed:
+        # skip the "full" output and don't scan into the streams
+        mediainfo = MediaInfo.parse(photo, full=False, parse_speed=0.1, library_file=mediainfo_library_file())
         general_track = mediainfo.general_tracks[0]  # type: ignore
         if dt_str := general_track.comapplequicktimecreationdate:
             # com.apple.quicktime.creationdate         : 2018-10-08T21:24:34-0700
-            dt = isoparse(dt_str)
+            dt = datetime.fromisoformat(dt_str)
         elif dt_str := general_track.encoded_date or general_track.tagged_date:
             assert dt_str.startswith('UTC') or dt_str.endswith('UTC'), 'encoded_date/tagged_date should have UTC marking'
             dt_str = dt_str.removeprefix('UTC').removesuffix('UTC').strip()
-            dt = isoparse(dt_str)
+            dt = datetime.fromisoformat(dt_str)
         else:
             return PhotoInfo.no_datetime(photo, 'Cannot extract datetime from MediaInfo')
 
@@ -187,60 +449,221 @@ class PhotoOrganizer:
             local_dt = dt.astimezone(self.timezone)
         # If dt is naive, assume it's UTC
         else:
-            local_dt = pytz.utc.localize(dt).astimezone(self.timezone)
+            local_dt = dt.replace(tzinfo=timezone.utc).astimezone(self.timezone)
         return PhotoInfo(photo, local_dt, 'MediaInfo')
 
     def start(self):
-        self._prepare_rename_tasks(self.iter_photo())
-        self.rename_tasks = sorted(self.rename_tasks)
-        self.skipped_items = sorted(self.skipped_items)
-        log.info(f'Collected {len(self.rename_tasks)} rename tasks.')
-        log.info(f'Collected {len(self.skipped_items)} skipped items.')
-        self._confirm_rename()
+        try:
+            self._prepare_rename_tasks(self.iter_photo())
+            # Sort in place by source path, instead of comparing the dataclasses
+            # field by field
+            self.rename_tasks.sort(key=lambda task: task.photo_info.path)
+            self.skipped_items.sort(key=lambda info: info.path)
+            log.info(f'Collected {len(self.rename_tasks)} rename tasks.')
+            log.info(f'Collected {len(self.skipped_items)} skipped items.')
+            self._confirm_rename()
+        finally:
+            if self.cache:
+                self.cache.close()
 
     @staticmethod
-    def get_deterministic_filename(photo: Path, dt: datetime, prefix: str = constants.DEFAULT_PREFIX) -> str:
+    def get_deterministic_filename(photo: Path, dt: datetime, h: str, prefix: str = constants.DEFAULT_PREFIX) -> str:
         timestamp = dt.strftime(constants.DATETIME_FMT)
-        # Generate a Git-like hash (first 7 chars of SHA-1)
-        with open(photo, 'rb') as f:
-            hash_obj = hashlib.sha1()
-            while chunk := f.read(1024 * 1024 * 10):  # 10 MiB
-                hash_obj.update(chunk)
-        h = hash_obj.hexdigest()[:7]
         fn = f'{prefix}{timestamp}_{h}{photo.suffix.lower()}'
         return fn
 
-    def _get_rename_task(self, photo: Path) -> RenameTask:
-        info = self.get_info(photo)
+    def _get_info_and_hash(self, photo: Path, st: os.stat_result | None = None) -> tuple[PhotoInfo, str]:
+        method = hash_method(*hash_params())
+        st = st or photo.stat()
+        if self.cache and (cached := self.cache.get(photo, st, self.timezone.key, method)):
+            dt, datetime_source, h = cached
+            # mtime may have been allowed in the run that filled the cache
+            if datetime_source != 'mtime' or self.allow_mtime:
+                return PhotoInfo(photo, dt.replace(tzinfo=self.timezone), datetime_source), h
+
+        ext = photo.suffix.lower()
+        if self.trust_names and self._looks_organized(photo):
+            # Get the datetime first: if the file is already where it belongs,
+            # its name has the hash and hashing can be skipped
+            info = self.get_info(photo, st, ext=ext)
+            h = self._hash_from_name(photo, info) or self._run_hash_job(st, hash_file, photo, *hash_params())
+        elif ext in self.pillow_exts and not self.exiftool:
+            # Reading embedded EXIF is cheap, so do it in the same job as
+            # hashing and open the file only once
+            embedded_exif, h = self._run_hash_job(st, read_exif_and_hash, photo, *hash_params())
+            info = self.get_info(photo, st, embedded_exif, ext)
+        else:
+            info = self.get_info(photo, st, ext=ext)
+            h = self._run_hash_job(st, hash_file, photo, *hash_params())
+        assert info.datetime is not None
+        assert info.datetime_source is not None
+
+        if self.cache:
+            self.cache.put(photo, st, self.timezone.key, method, info.datetime, info.datetime_source, h)
+        return info, h
+
+    @staticmethod
+    def _looks_organized(photo: Path) -> bool:
+        '''Cheap check on the name only: a year directory, and a stem ending with _ and a 7-char hash'''
+        stem = photo.stem
+        return (
+            photo.parent.name.isdigit()
+            and len(stem) > 8 and stem[-8] == '_'
+            and all(c in '0123456789abcdef' for c in stem[-7:])
+        )
+
+    def _hash_from_name(self, photo: Path, info: PhotoInfo) -> str | None:
+        '''Return the hash in the name of a file that is already at its destination, or None'''
+        assert info.datetime is not None
+        h = photo.stem[-7:]
+        destination = self.dst_dir / str(info.datetime.year) / self.get_deterministic_filename(photo, info.datetime, h)
+        if destination.name != photo.name:
+            return None
+        try:
+            return h if destination.samefile(photo) else None
+        except FileNotFoundError:
+            return None
+
+    def _run_hash_job(self, st: os.stat_result, func: Callable[..., T], *args) -> T:
+        '''Run a hash job in the process pool, or inline for a small file.
+
+        Hashing is CPU-bound, so large files go to the process pool. While
+        this thread waits, the other threads carry on extracting metadata.
+        '''
+        if st.st_size < self.inline_hash_size:
+            return func(*args)
+        assert self._hash_executor is not None
+        return self._hash_executor.submit(func, *args).result()
+
+    def _get_rename_task(self, photo: Path, st: os.stat_result | None = None) -> RenameTask:
+        info, h = self._get_info_and_hash(photo, st)
         assert info.datetime is not None
 
         # Compute filename
-        fn = self.get_deterministic_filename(photo, info.datetime)
+        fn = self.get_deterministic_filename(photo, info.datetime, h)
 
         full_path = self.dst_dir / str(info.datetime.year) / fn
         rename_task = RenameTask(info, full_path)
         return rename_task
 
-    def _prepare_rename_tasks(self, photos: Iterable[Path]) -> None:
-        completed, failed = tpe_submit(self._get_rename_task, sorted(photos))
-        for photo, task in completed:
-            # Validate
-            if task.destination.exists():
-                # Allow idempotent operations: don't rename a file
-                # if its filename is already what we want
-                if task.destination.samefile(task.photo_info.path):
-                    continue
-                info = task.photo_info
-                info.errors.append(f'Destination already exists: {task.destination}')
-                self.skipped_items.append(info)
+    def _find_duplicates(self, photos: Iterable[Path], max_workers: int) -> tuple[list[tuple[Path, os.stat_result | None]], list[tuple[Path, Path]]]:
+        '''Split photos into (photo, stat) to process and (original, duplicate) pairs.
+
+        Files are grouped by size, and groups of more than one by the digest
+        of their first bytes, which is enough to tell most of them apart. The
+        members of a group are byte-for-byte compared with its first one, so
+        a copy is never parsed nor hashed. Empty files are left alone.
+
+        The photos to process are sorted by path, and come with the stat()
+        taken here so that it is not repeated. Files that cannot be read here
+        are processed as usual, so that they are reported as skipped.
+        '''
+        # stat() and read in the worker threads, like the rest of the per-file work
+        stated, failed = tpe_submit(Path.stat, photos, max_workers=max_workers)
+        stats: dict[Path, os.stat_result | None] = dict(stated)
+        unique = [photo for photo, _ in failed]
+        stats.update(dict.fromkeys(unique))
+
+        sizes = {photo: st.st_size for photo, st in stated}
+        by_size: defaultdict[int, list[Path]] = defaultdict(list)
+        # Compare Paths like start() sorts the tasks, so that both agree on
+        # which file of a group comes first
+        for photo in sorted(sizes):
+            by_size[sizes[photo]].append(photo)
+        same_size = []
+        for size, group in by_size.items():
+            if size == 0 or len(group) == 1:
+                unique.extend(group)
+            else:
+                same_size.extend(group)
+
+        candidates: list[tuple[Path, Path]] = []
+        if same_size:
+            digested, failed = tpe_submit(head_digest, same_size, max_workers=max_workers)
+            unique.extend(photo for photo, _ in failed)
+            heads = dict(digested)
+            by_head: defaultdict[tuple[int, bytes], list[Path]] = defaultdict(list)
+            # Keep the sorted order, so that the first file of a group is the original
+            for photo in same_size:
+                if photo in heads:
+                    by_head[sizes[photo], heads[photo]].append(photo)
+            for same_head in by_head.values():
+                unique.append(same_head[0])
+                candidates.extend((same_head[0], photo) for photo in same_head[1:])
+
+        completed: list[tuple[tuple[Path, Path], bool]] = []
+        failed = []
+        if candidates:
+            log.info(f'Comparing {len(candidates)} possible duplicates.')
+            completed, failed = tpe_submit(self._is_duplicate, candidates, max_workers=max_workers)
+        duplicates = []
+        for pair, same in completed:
+            if same:
+                duplicates.append(pair)
             else:
-                self.rename_tasks.append(task)
-        for photo, exception in failed:
+                unique.append(pair[1])
+        # Let the normal path report unreadable files
+        unique.extend(pair[1] for pair, _ in failed)
+        return [(photo, stats[photo]) for photo in sorted(unique)], duplicates
+
+    @staticmethod
+    def _is_duplicate(pair: tuple[Path, Path]) -> bool:
+        return filecmp.cmp(*pair, shallow=False)
+
+    def default_concurrency(self) -> int:
+        # Concurrent reads make a spinning disk seek back and forth, which is
+        # slower than reading the files one by one
+        if is_rotational(self.src_dir):
+            log.info('Source is on a spinning disk, processing one file at a time. Use --max-concurrency to override.')
+            return 1
+        # Past a handful of threads, concurrent I/O stops paying off and
+        # only adds contention. Each thread blocks on its hash job, so this
+        # also caps the outstanding hash jobs.
+        return min(os.cpu_count() or 1, 8)
+
+    def _prepare_rename_tasks(self, photos: Iterable[Path]) -> None:
+        max_workers = self.max_concurrency or self.default_concurrency()
+        log.info(f'Processing with {max_workers} threads.')
+        # As many hash processes as threads: on a spinning disk, more would
+        # read several files at once again. Fork the processes from a
+        # forkserver rather than from this process, where threads may hold
+        # locks (sqlite, tqdm, exiftool) at the time.
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._hash_executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method))
+        try:
+            to_process, duplicates = self._find_duplicates(photos, max_workers)
+            completed, failed = tpe_submit(lambda item: self._get_rename_task(*item), to_process, max_workers=max_workers)
+        finally:
+            self._hash_executor.shutdown(cancel_futures=True)
+            self._hash_executor = None
+            if self.cache:
+                self.cache.commit()
+        for _, task in completed:
+            # Allow idempotent operations: don't rename a file if its filename
+            # is already what we want. Compare absolute paths (like the cache
+            # keys), as src_dir and dst_dir may be spelled differently. Other
+            # existing destinations are only found when renaming, which saves
+            # a stat() per file.
+            if os.path.abspath(task.destination) == os.path.abspath(task.photo_info.path):
+                continue
+            self.rename_tasks.append(task)
+        for (photo, _), exception in failed:
             info = PhotoInfo.no_datetime(photo, repr(exception))
             self.skipped_items.append(info)
+        # Like renaming the copy over its original would, but without ever
+        # replacing a file: a copy is deleted once its original is organized.
+        # If the original is skipped, the copy stays with it for the next run.
+        destinations = {task.photo_info.path: task.destination for _, task in completed}
+        for original, photo in duplicates:
+            if original in destinations:
+                self.duplicates.append((destinations[original], photo))
+                self.skipped_items.append(PhotoInfo.no_datetime(photo, f'Duplicate of {original}, deleted once it is organized'))
+            else:
+                self.skipped_items.append(PhotoInfo.no_datetime(photo, f'Duplicate of {original}'))
 
     def _confirm_rename(self) -> None:
         print('Rename the files, preview the tasks, save the tasks in CSV, or abort?')
+        print('Existing files are never overwritten. They are not checked for in the preview: collisions are reported after renaming.')
         try:
             resp = input('(R)ename/(p)review/(s)ave/(a)bort? ').lower()
         except KeyboardInterrupt:
@@ -260,27 +683,85 @@ class PhotoOrganizer:
             self._confirm_rename()
 
     def _do_rename(self) -> None:
-        for task in tqdm(self.rename_tasks):
-            task.destination.parent.mkdir(parents=True, exist_ok=True)
-            task.photo_info.path.rename(task.destination)
+        # Destinations collapse into a handful of year directories, so create
+        # each of them once instead of once per file
+        for parent in {task.destination.parent for task in self.rename_tasks}:
+            parent.mkdir(parents=True, exist_ok=True)
+        # rename(2) mostly waits on filesystem metadata updates, which can
+        # proceed concurrently. Across filesystems, files are copied though:
+        # don't make a spinning source or destination disk seek back and forth.
+        max_workers = self.max_concurrency
+        if max_workers is None:
+            if self.rename_tasks and is_rotational(self.dst_dir):
+                log.info('Destination is on a spinning disk, renaming one file at a time. Use --max-concurrency to override.')
+                max_workers = 1
+            else:
+                max_workers = self.default_concurrency()
+        completed, failed = tpe_submit(self._rename, self.rename_tasks, max_workers=max_workers)
+        if self.cache:
+            for task, _ in completed:
+                self.cache.move(task.photo_info.path, task.destination)
+        errors = []
+        for task, exception in sorted(failed, key=lambda item: item[0].photo_info.path):
+            # The same file under another spelling of its path (e.g. relative
+            # vs absolute directories) is already where we want it
+            if isinstance(exception, FileExistsError) and self._is_same_file(task.destination, task.photo_info.path):
+                continue
+            errors.append(f'{task}: {exception!r}')
+        # One record instead of one per file: each write to the console takes
+        # the tqdm lock and flushes
+        if errors:
+            log.error(f'Failed to rename {len(errors)} files:\n' + '\n'.join(errors))
+
+        if self.duplicates:
+            _, failed = tpe_submit(self._delete_duplicate, self.duplicates, max_workers=max_workers)
+            if failed:
+                log.error(f'Kept {len(failed)} duplicates:\n' + '\n'.join(f'{photo}: {exception!r}' for (_, photo), exception in sorted(failed, key=lambda item: item[0][1])))
+
+    @staticmethod
+    def _is_same_file(a: Path, b: Path) -> bool:
+        try:
+            return a.samefile(b)
+        except OSError:
+            # e.g. a dangling symlink at the destination, or a source that
+            # has vanished: a collision like any other
+            return False
+
+    @staticmethod
+    def _rename(task: RenameTask) -> None:
+        # Never overwrite a file that appeared at the destination since the
+        # tasks were prepared
+        rename_noreplace(task.photo_info.path, task.destination)
+
+    @staticmethod
+    def _delete_duplicate(pair: tuple[Path, Path]) -> None:
+        destination, photo = pair
+        # Compare again: the original may not have made it to its
+        # destination, or either file may have changed since
+        if not filecmp.cmp(destination, photo, shallow=False):
+            raise RuntimeError(f'No longer the same as {destination}')
+        photo.unlink()
 
     def _preview_tasks(self) -> None:
-        text = io.StringIO()
-        text.write(f'Rename ({len(self.rename_tasks)}):\n')
-        text.write(tabulate([t.row() for t in self.rename_tasks], headers='keys'))
-        text.write('\n\n')
-        text.write(f'Skip ({len(self.skipped_items)}):\n')
-        text.write(tabulate([i.row() for i in self.skipped_items], headers='keys'))
-        text.write('\n\n')
-        click.echo_via_pager(text.getvalue())
+        # Feed the pager line by line instead of formatting every task into
+        # one string first
+        def lines() -> Iterator[str]:
+            yield f'Rename ({len(self.rename_tasks)}):\n'
+            yield from iter_table(self.rename_tasks, RenameTask.header())
+            yield '\n'
+            yield f'Skip ({len(self.skipped_items)}):\n'
+            yield from iter_table(self.skipped_items, PhotoInfo.header())
+            yield '\n'
+        click.echo_via_pager(lines())
 
     def _save_tasks(self) -> None:
         with open('rename_tasks.csv', 'w', encoding='utf-8') as f:
-            rename_tasks_csv = csv.DictWriter(f, fieldnames=RenameTask.header())
-            rename_tasks_csv.writeheader()
+            # Plain rows instead of a dict per task for csv.DictWriter
+            rename_tasks_csv = csv.writer(f)
+            rename_tasks_csv.writerow(RenameTask.header())
             rename_tasks_csv.writerows(t.row() for t in self.rename_tasks)
         with open('skipped_items.csv', 'w', encoding='utf-8') as f:
-            skipped_items_csv = csv.DictWriter(f, fieldnames=PhotoInfo.header())
-            skipped_items_csv.writeheader()
+            skipped_items_csv = csv.writer(f)
+            skipped_items_csv.writerow(PhotoInfo.header())
             skipped_items_csv.writerows(i.row() for i in self.skipped_items)
         log.info('Preview of operations written to `rename_tasks.csv` and `skipped_items.csv`')
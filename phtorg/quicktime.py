@@ -0,0 +1,117 @@
+import os
+import struct
+from pathlib import Path
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from io import BufferedIOBase
+
+from phtorg.isobmff import iter_boxes
+from phtorg.isobmff import read_box_header
+
+
+# Timestamps in `mvhd` are seconds since this epoch
+QUICKTIME_EPOCH = datetime(1904, 1, 1, tzinfo=timezone.utc)
+
+APPLE_CREATION_DATE = b'com.apple.quicktime.creationdate'
+
+
+def read_creation_date(path: Path) -> datetime | None:
+    '''Read the creation datetime of an MP4/MOV file from its `moov` box.
+
+    The `com.apple.quicktime.creationdate` metadata item (written by iPhones,
+    with the local offset) takes precedence over the UTC creation time of
+    `mvhd`, like MediaInfo does. Only the box headers and `moov` are read, the
+    media data is skipped. Returns an aware datetime (in UTC if the file has
+    no offset), or None if the file has no datetime. Raises ValueError or
+    struct.error on anything unexpected, so that the caller can fall back to
+    MediaInfo.
+    '''
+    with open(path, 'rb') as f:
+        return read_creation_date_fileobj(f)
+
+
+def read_creation_date_fileobj(f: BufferedIOBase) -> datetime | None:
+    '''Same as read_creation_date(), but on a file opened in binary mode'''
+    f.seek(0)
+    moov = None
+    while moov is None:
+        box_type, size = read_box_header(f)
+        if box_type == b'moov':
+            moov = f.read(size)
+        elif size < 0:
+            raise ValueError('No moov box')
+        else:
+            # `mdat` comes before `moov` unless the file is "fast start"
+            f.seek(size, os.SEEK_CUR)
+
+    mvhd = None
+    metas = []
+    for box_type, body in iter_boxes(moov):
+        if box_type == b'mvhd':
+            mvhd = body
+        # iPhones write `moov/meta`, ffmpeg writes `moov/udta/meta`
+        elif box_type == b'meta':
+            metas.append(body)
+        elif box_type == b'udta':
+            metas.extend(meta for child_type, meta in iter_boxes(body) if child_type == b'meta')
+    for meta in metas:
+        if dt_str := _find_apple_creation_date(meta):
+            # com.apple.quicktime.creationdate         : 2018-10-08T21:24:34-0700
+            dt = datetime.fromisoformat(dt_str)
+            # Without an offset, assume UTC like MediaInfo dates, rather than
+            # whatever timezone this machine is in
+            return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    if mvhd is None:
+        raise ValueError('No mvhd box')
+    return _parse_mvhd(mvhd)
+
+
+def _parse_mvhd(mvhd: bytes) -> datetime | None:
+    '''Return the creation time of a `mvhd` box, or its modification time if unset'''
+    version, = struct.unpack_from('>B', mvhd)
+    if version == 1:
+        creation_time, modification_time = struct.unpack_from('>QQ', mvhd, 4)
+    else:
+        creation_time, modification_time = struct.unpack_from('>II', mvhd, 4)
+    # Encoders that don't know the time write 0
+    seconds = creation_time or modification_time
+    if not seconds:
+        return None
+    return QUICKTIME_EPOCH + timedelta(seconds=seconds)
+
+
+def _find_apple_creation_date(meta: bytes) -> str | None:
+    '''Return com.apple.quicktime.creationdate from a QuickTime `meta` box, if any'''
+    # Unlike the ISO `meta`, the QuickTime one is not a FullBox, but some
+    # writers add version and flags anyway
+    offset = 0 if meta[4:8] == b'hdlr' else 4
+    boxes = dict(iter_boxes(meta, offset))
+    if b'keys' not in boxes or b'ilst' not in boxes:
+        return None
+
+    # `keys` is a FullBox: entry count, then (size, namespace, name) per key
+    keys = boxes[b'keys']
+    entry_count, = struct.unpack_from('>I', keys, 4)
+    pos = 8
+    key_index = None
+    for i in range(1, entry_count + 1):
+        key_size, = struct.unpack_from('>I', keys, pos)
+        if key_size < 8:
+            raise ValueError('Invalid key size')
+        if keys[pos + 8:pos + key_size] == APPLE_CREATION_DATE:
+            key_index = i
+            break
+        pos += key_size
+    if key_index is None:
+        return None
+
+    # Items in `ilst` are typed by the 1-based index of their key
+    for box_type, item in iter_boxes(boxes[b'ilst']):
+        if int.from_bytes(box_type, 'big') != key_index:
+            continue
+        for data_type, data in iter_boxes(item):
+            # `data`: type indicator and locale, then the UTF-8 value
+            if data_type == b'data':
+                return data[8:].decode('utf-8', 'replace').strip('\0 ')
+    return None
@@ -0,0 +1,94 @@
+import os
+import sys
+import errno
+import ctypes
+import shutil
+import tempfile
+import functools
+
+
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+
+@functools.cache
+def _renameat2():
+    '''The renameat2() of libc, or None if not available (non-Linux, glibc < 2.28, etc.)'''
+    if not sys.platform.startswith('linux'):
+        return None
+    libc = ctypes.CDLL(None, use_errno=True)
+    return getattr(libc, 'renameat2', None)
+
+
+def rename_noreplace(src: str | os.PathLike, dst: str | os.PathLike) -> None:
+    '''Rename a file, raising FileExistsError instead of replacing `dst`.
+
+    On Linux, renameat2(RENAME_NOREPLACE) checks and renames atomically. On
+    other platforms and on filesystems that do not support the flag, fall
+    back to checking for `dst` before os.rename(). Across filesystems, the
+    file is copied and then removed.
+    '''
+    try:
+        _rename_noreplace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        _move_across_devices(src, dst)
+
+
+def _rename_noreplace(src: str | os.PathLike, dst: str | os.PathLike) -> None:
+    renameat2 = _renameat2()
+    if renameat2 is not None:
+        ret = renameat2(AT_FDCWD, os.fsencode(src), AT_FDCWD, os.fsencode(dst), RENAME_NOREPLACE)
+        if ret == 0:
+            return
+        err = ctypes.get_errno()
+        if err not in (errno.EINVAL, errno.ENOSYS):
+            # OSError() picks the subclass, e.g. FileExistsError for EEXIST
+            raise OSError(err, os.strerror(err), os.fspath(src), None, os.fspath(dst))
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), os.fspath(src), None, os.fspath(dst))
+    os.rename(src, dst)
+
+
+def _move_across_devices(src: str | os.PathLike, dst: str | os.PathLike) -> None:
+    '''Copy `src` (in the kernel with sendfile() on Linux) next to `dst`, move it into place, then remove `src`.
+
+    The copy only gets its final name once it is complete and on disk, so an
+    interrupted move never leaves a truncated file that looks organized.
+    '''
+    # Don't copy a whole file only to find out the destination exists
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), os.fspath(src), None, os.fspath(dst))
+    # Hidden, and without a photo extension, so that it is never picked up
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.fspath(dst)) or '.', prefix='.', suffix='.phtorg-tmp')
+    try:
+        with open(src, 'rb') as fsrc, open(fd, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            # Elsewhere, sendfile() only writes to sockets
+            if sys.platform.startswith('linux'):
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, min(size - offset, 1 << 30))
+                    if sent == 0:
+                        break
+                    offset += sent
+            else:
+                shutil.copyfileobj(fsrc, fdst)
+                offset = fdst.tell()
+            if offset != size:
+                raise OSError(errno.EIO, f'Copied {offset} of {size} bytes, the file changed while copying', os.fspath(src))
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        # The mtime matters: it may be the datetime of the file, and it is
+        # part of the cache key. This also replaces the 0600 mode of mkstemp().
+        shutil.copystat(src, tmp)
+        try:
+            _rename_noreplace(tmp, dst)
+        except FileExistsError:
+            # The destination appeared while copying: report it like a rename
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), os.fspath(src), None, os.fspath(dst)) from None
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    os.unlink(src)
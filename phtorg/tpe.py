@@ -1,6 +1,9 @@
+import os
+import itertools
 import concurrent.futures
 from collections.abc import Callable
 from collections.abc import Iterable
+from collections.abc import Sized
 from typing import Any
 from typing import TypeVar
 
@@ -12,38 +15,51 @@ Completed = tuple[T, Any]
 Failed = tuple[T, Exception]
 
 
-def tpe_submit(func: Callable, items: Iterable[T], raise_exception: bool = False) -> tuple[list[Completed], list[Failed]]:
-    '''Run tasks through TPE with a progress bar.'''
+def tpe_submit(func: Callable, items: Iterable[T], raise_exception: bool = False, max_workers: int | None = None) -> tuple[list[Completed], list[Failed]]:
+    '''Run tasks through TPE with a progress bar.
+
+    Items are pulled from `items` as tasks complete, keeping at most twice
+    `max_workers` tasks in flight, so that a generator is never materialized
+    and memory does not grow with the number of items.
+    '''
     completed: list[Completed] = []
     failed: list[Failed] = []
 
-    tpe = concurrent.futures.ThreadPoolExecutor()
-    futures_map = {
-        tpe.submit(func, item): item
-        for item in items
-    }
-    pending = set(futures_map.keys())
-    pbar = tqdm(total=len(futures_map))
+    tpe = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    # Same default as ThreadPoolExecutor
+    max_in_flight = 2 * (max_workers or min(32, (os.cpu_count() or 1) + 4))
+    items_iter = iter(items)
+    futures_map: dict[concurrent.futures.Future, T] = {}
+    pbar = tqdm(total=len(items) if isinstance(items, Sized) else None)
     try:
-        while pending:
-            # Wait for a few to complete
-            done_now, pending = concurrent.futures.wait(pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
-            for future in done_now:
-                pbar.update(1)
+        while True:
+            for item in itertools.islice(items_iter, max_in_flight - len(futures_map)):
+                futures_map[tpe.submit(func, item)] = item
+            if not futures_map:
+                break
+            # Sleep until the next one completes, instead of polling
+            done, _ = concurrent.futures.wait(futures_map, return_when=concurrent.futures.FIRST_COMPLETED)
+            # One progress bar refresh per wake-up, not per task
+            pbar.update(len(done))
+            for future in done:
+                item = futures_map.pop(future)
                 try:
                     result = future.result()
                 except Exception as e:
                     if raise_exception:
                         raise
-                    item = futures_map[future]
                     failed.append((item, e))
-                    continue
                 else:
-                    item = futures_map[future]
                     completed.append((item, result))
-    except KeyboardInterrupt:
-        tqdm.write('KeyboardInterrupt')
+    except BaseException:
+        # Don't wait for the tasks still in flight before propagating. This
+        # includes KeyboardInterrupt: returning the results so far would let
+        # the caller carry on with only part of the items.
         tpe.shutdown(wait=False, cancel_futures=True)
+        raise
+    else:
+        # Everything has completed: only joins the idle worker threads
+        tpe.shutdown()
     finally:
         pbar.close()
-        return completed, failed
+    return completed, failed
@@ -0,0 +1,91 @@
+import sqlite3
+import unittest
+from pathlib import Path
+from datetime import datetime
+from tempfile import TemporaryDirectory
+
+from phtorg.cache import InfoCache
+
+
+DT = datetime(2021, 1, 2, 3, 4, 5)
+
+
+class TestInfoCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.cache_path = self.tmp / 'cache.sqlite'
+        self.cache = InfoCache(self.cache_path)
+        self.addCleanup(lambda: self.cache.close())
+        self.photo = self.tmp / 'a.jpg'
+        self.photo.write_bytes(b'photo')
+        self.st = self.photo.stat()
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get(self.photo, self.st, 'Asia/Tokyo', 'sha1'))
+        self.cache.put(self.photo, self.st, 'Asia/Tokyo', 'sha1', DT, 'EXIF', 'a1b2c3d')
+        self.assertEqual(self.cache.get(self.photo, self.st, 'Asia/Tokyo', 'sha1'), (DT, 'EXIF', 'a1b2c3d'))
+        # Timezone and hash method change the results
+        self.assertIsNone(self.cache.get(self.photo, self.st, 'UTC', 'sha1'))
+        self.assertIsNone(self.cache.get(self.photo, self.st, 'Asia/Tokyo', 'blake3'))
+
+    def test_modified(self):
+        self.cache.put(self.photo, self.st, 'Asia/Tokyo', 'sha1', DT, 'EXIF', 'a1b2c3d')
+        self.photo.write_bytes(b'modified')
+        self.assertIsNone(self.cache.get(self.photo, self.photo.stat(), 'Asia/Tokyo', 'sha1'))
+
+    def test_relative_path(self):
+        # Keys are absolute, however the path is spelled
+        self.cache.put(self.photo, self.st, 'Asia/Tokyo', 'sha1', DT, 'EXIF', 'a1b2c3d')
+        spelled = self.tmp / 'sub' / '..' / 'a.jpg'
+        self.assertEqual(self.cache.get(spelled, self.st, 'Asia/Tokyo', 'sha1'), (DT, 'EXIF', 'a1b2c3d'))
+
+    def test_move(self):
+        self.cache.put(self.photo, self.st, 'Asia/Tokyo', 'sha1', DT, 'EXIF', 'a1b2c3d')
+        moved = self.tmp / '2021' / 'IMG_20210102_030405_a1b2c3d.jpg'
+        self.cache.move(self.photo, moved)
+        self.assertIsNone(self.cache.get(self.photo, self.st, 'Asia/Tokyo', 'sha1'))
+        self.assertEqual(self.cache.get(moved, self.st, 'Asia/Tokyo', 'sha1'), (DT, 'EXIF', 'a1b2c3d'))
+
+    def test_persistent(self):
+        self.cache.put(self.photo, self.st, 'Asia/Tokyo', 'sha1', DT, 'EXIF', 'a1b2c3d')
+        self.cache.close()
+        self.cache = InfoCache(self.cache_path)
+        self.assertEqual(self.cache.get(self.photo, self.st, 'Asia/Tokyo', 'sha1'), (DT, 'EXIF', 'a1b2c3d'))
+
+
+class TestReadonlyInfoCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.cache_path = self.tmp / 'cache.sqlite'
+        self.photo = self.tmp / 'a.jpg'
+        self.photo.write_bytes(b'photo')
+        self.st = self.photo.stat()
+        cache = InfoCache(self.cache_path)
+        cache.put(self.photo, self.st, 'Asia/Tokyo', 'sha1:sample=4096', DT, 'EXIF', 'a1b2c3d')
+        cache.close()
+
+    def test_get_info(self):
+        cache = InfoCache(self.cache_path, readonly=True)
+        self.addCleanup(cache.close)
+        # Whatever the hash method of the run that wrote it
+        self.assertEqual(cache.get_info(self.photo, self.st, 'Asia/Tokyo'), (DT, 'EXIF'))
+        self.assertIsNone(cache.get_info(self.photo, self.st, 'UTC'))
+
+    def test_unmodified(self):
+        before = self.cache_path.read_bytes(), self.cache_path.stat().st_mtime_ns
+        cache = InfoCache(self.cache_path, readonly=True)
+        cache.get_info(self.photo, self.st, 'Asia/Tokyo')
+        with self.assertRaises(sqlite3.OperationalError):
+            cache.put(self.photo, self.st, 'UTC', 'sha1', DT, 'EXIF', 'a1b2c3d')
+        cache.close()
+        self.assertEqual((self.cache_path.read_bytes(), self.cache_path.stat().st_mtime_ns), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
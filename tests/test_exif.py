@@ -0,0 +1,132 @@
+import io
+import struct
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from PIL import Image
+
+from phtorg import exif
+from phtorg.organizer import PhotoOrganizer
+
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+DATETIME_ORIGINAL = '2021:01:02 03:04:05'
+
+
+def make_jpeg(**tags: str) -> bytes:
+    '''A tiny JPEG with the given Exif IFD tags (by exif.* constant name)'''
+    _exif = Image.Exif()
+    _exif.get_ifd(exif.EXIF_IFD_POINTER).update({getattr(exif, name): value for name, value in tags.items()})
+    buf = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buf, format='JPEG', exif=_exif)
+    return buf.getvalue()
+
+
+def truncate_app1(jpeg: bytes, needle: bytes) -> bytes:
+    '''Cut the APP1 segment in the middle of `needle`, and fix up its length'''
+    # The segment starts with its marker and length, then 'Exif\0\0'
+    start = jpeg.index(b'Exif\0\0') - 4
+    assert jpeg[start:start + 2] == b'\xff\xe1'
+    length, = struct.unpack_from('>H', jpeg, start + 2)
+    segment = jpeg[start + 4:start + 2 + length]
+    segment = segment[:segment.index(needle) + len(needle) // 2]
+    return jpeg[:start + 2] + struct.pack('>H', len(segment) + 2) + segment + jpeg[start + 2 + length:]
+
+
+class TestReadJpegExif(unittest.TestCase):
+
+    def test_datetime(self):
+        tags = exif.read_jpeg_exif_fileobj(io.BytesIO(make_jpeg(DATETIME_ORIGINAL=DATETIME_ORIGINAL)))
+        self.assertEqual(tags[exif.DATETIME_ORIGINAL], DATETIME_ORIGINAL)
+
+    def test_same_as_pillow(self):
+        jpeg = make_jpeg(DATETIME_ORIGINAL=DATETIME_ORIGINAL, OFFSET_TIME_ORIGINAL='+09:00')
+        tags = exif.read_jpeg_exif_fileobj(io.BytesIO(jpeg))
+        with Image.open(io.BytesIO(jpeg)) as image:
+            _exif = image.getexif()
+            pillow_tags = {**_exif, **_exif.get_ifd(exif.EXIF_IFD_POINTER)}
+        for tag in exif.DATETIME_TAGS:
+            self.assertEqual(tags.get(tag), pillow_tags.get(tag))
+
+    def test_no_exif(self):
+        buf = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(buf, format='JPEG')
+        self.assertEqual(exif.read_jpeg_exif_fileobj(buf), {})
+
+    def test_value_out_of_bounds(self):
+        jpeg = truncate_app1(make_jpeg(DATETIME_ORIGINAL=DATETIME_ORIGINAL), DATETIME_ORIGINAL.encode())
+        with self.assertRaises(ValueError):
+            exif.read_jpeg_exif_fileobj(io.BytesIO(jpeg))
+
+    def test_ifd_out_of_bounds(self):
+        data = struct.pack('<2sHI', b'II', 42, 8) + struct.pack('<H', 3) + bytes(12)
+        with self.assertRaises(ValueError):
+            exif.parse_tiff(data)
+
+    def test_invalid_exif_ifd_pointer(self):
+        # Exif IFD pointer (LONG) with a count of 2, which cannot be inline
+        data = struct.pack('<2sHI', b'II', 42, 8) + struct.pack('<HHHII', 1, exif.EXIF_IFD_POINTER, 4, 2, 26) + bytes(8)
+        with self.assertRaises(ValueError):
+            exif.parse_tiff(data)
+
+    def test_out_of_bounds_falls_back_to_pillow(self):
+        jpeg = truncate_app1(make_jpeg(DATETIME_ORIGINAL=DATETIME_ORIGINAL), DATETIME_ORIGINAL.encode())
+        with TemporaryDirectory() as tmp:
+            photo = Path(tmp, 'a.jpg')
+            photo.write_bytes(jpeg)
+            org = PhotoOrganizer(Path(tmp), Path(tmp), 'UTC')
+            with mock.patch.object(org, 'get_info_from_pillow') as get_info_from_pillow:
+                org.get_info_from_embedded_exif(photo)
+            get_info_from_pillow.assert_called_once_with(photo)
+
+
+class TestReadHeifExif(unittest.TestCase):
+
+    def test_same_as_pillow(self):
+        # exif.heic: an 8x8 image with DateTime, DateTimeOriginal and OffsetTimeOriginal
+        tags = exif.read_heif_exif(FIXTURES / 'exif.heic')
+        with Image.open(FIXTURES / 'exif.heic') as image:
+            _exif = image.getexif()
+            pillow_tags = {**_exif, **_exif.get_ifd(exif.EXIF_IFD_POINTER)}
+        self.assertEqual(tags[exif.DATETIME_ORIGINAL], DATETIME_ORIGINAL)
+        for tag in exif.DATETIME_TAGS:
+            self.assertEqual(tags.get(tag), pillow_tags.get(tag))
+
+    def test_sniff_format(self):
+        with open(FIXTURES / 'exif.heic', 'rb') as f:
+            self.assertEqual(exif.read_exif_fileobj(f)[exif.DATETIME_ORIGINAL], DATETIME_ORIGINAL)
+        self.assertEqual(exif.read_exif_fileobj(io.BytesIO(make_jpeg(DATETIME_ORIGINAL=DATETIME_ORIGINAL)))[exif.DATETIME_ORIGINAL], DATETIME_ORIGINAL)
+
+
+class TestGetInfoFromPillow(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.org = PhotoOrganizer(self.tmp, self.tmp, 'UTC')
+
+    def test_jpeg(self):
+        photo = self.tmp / 'a.jpg'
+        photo.write_bytes(make_jpeg(DATETIME_ORIGINAL=DATETIME_ORIGINAL))
+        info = self.org.get_info_from_pillow(photo)
+        self.assertEqual(info.datetime_source, 'EXIF')
+        self.assertEqual(str(info.datetime), '2021-01-02 03:04:05+00:00')
+
+    def test_heif(self):
+        info = self.org.get_info_from_pillow(FIXTURES / 'exif.heic')
+        self.assertEqual(info.datetime_source, 'EXIF')
+
+    def test_other_format(self):
+        # Not what the extension says: Pillow must still probe its other plugins
+        photo = self.tmp / 'a.jpg'
+        Image.new('RGB', (8, 8)).save(photo, format='PNG')
+        info = self.org.get_info_from_pillow(photo)
+        self.assertEqual(info.errors, ('File is EXIF-compatible but no EXIF found',))
+
+
+if __name__ == '__main__':
+    unittest.main()
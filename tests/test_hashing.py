@@ -0,0 +1,63 @@
+import os
+import hashlib
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from phtorg.hashing import hash_file
+from phtorg.hashing import hash_fileobj
+
+
+SAMPLE_SIZE = 4096
+
+
+class TestSampledHash(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.data = os.urandom(5 * SAMPLE_SIZE)
+
+    def write(self, data: bytes) -> Path:
+        path = self.tmp / 'a.mov'
+        path.write_bytes(data)
+        return path
+
+    def test_whole_file(self):
+        self.assertEqual(hash_file(self.write(self.data)), hashlib.sha1(self.data).hexdigest()[:7])
+
+    def test_head_and_tail(self):
+        h = hash_file(self.write(self.data), 'sha1', SAMPLE_SIZE)
+        sampled = self.data[:SAMPLE_SIZE] + self.data[-SAMPLE_SIZE:] + len(self.data).to_bytes(8, 'little')
+        self.assertEqual(h, hashlib.sha1(sampled).hexdigest()[:7])
+
+        # Only the samples and the size count
+        middle = self.data[:2 * SAMPLE_SIZE] + bytes(SAMPLE_SIZE) + self.data[3 * SAMPLE_SIZE:]
+        self.assertEqual(hash_file(self.write(middle), 'sha1', SAMPLE_SIZE), h)
+        tail = self.data[:-1] + b'\0'
+        self.assertNotEqual(hash_file(self.write(tail), 'sha1', SAMPLE_SIZE), h)
+
+    def test_small_file(self):
+        # Not larger than two samples: the whole file is hashed
+        data = self.data[:2 * SAMPLE_SIZE]
+        self.assertEqual(hash_file(self.write(data), 'sha1', SAMPLE_SIZE), hash_file(self.write(data)))
+
+    def test_head_only(self):
+        h = hash_file(self.write(self.data), 'sha1', SAMPLE_SIZE, sample_tail=False)
+        sampled = self.data[:SAMPLE_SIZE] + len(self.data).to_bytes(8, 'little')
+        self.assertEqual(h, hashlib.sha1(sampled).hexdigest()[:7])
+        tail = self.data[:-1] + b'\0'
+        self.assertEqual(hash_file(self.write(tail), 'sha1', SAMPLE_SIZE, sample_tail=False), h)
+        # Not larger than one sample: the whole file is hashed
+        data = self.data[:SAMPLE_SIZE]
+        self.assertEqual(hash_file(self.write(data), 'sha1', SAMPLE_SIZE, sample_tail=False), hash_file(self.write(data)))
+
+    def test_any_position(self):
+        with open(self.write(self.data), 'rb') as f:
+            f.read()
+            self.assertEqual(hash_fileobj(f, 'sha1', SAMPLE_SIZE), hash_file(f.name, 'sha1', SAMPLE_SIZE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,311 @@
+import os
+import unittest
+from pathlib import Path
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from tabulate import tabulate
+
+from phtorg.cache import InfoCache
+from phtorg.organizer import PhotoInfo
+from phtorg.organizer import RenameTask
+from phtorg.organizer import PhotoOrganizer
+from phtorg.organizer import iter_table
+from tests.test_exif import make_jpeg
+
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+class TestIterPhoto(unittest.TestCase):
+
+    def test_unreadable_directory(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        src = Path(tmp.name)
+        for name in ('a/1.jpg', 'b/2.jpg', '3.jpg', '4.txt'):
+            (src / name).parent.mkdir(exist_ok=True)
+            (src / name).write_bytes(b'')
+        scandir = os.scandir
+
+        def unreadable_a(path):
+            if Path(path) == src / 'a':
+                raise PermissionError(13, 'Permission denied', str(path))
+            return scandir(path)
+
+        org = PhotoOrganizer(src, src, 'UTC')
+        with mock.patch('os.scandir', unreadable_a), self.assertLogs('phtorg.organizer', 'WARNING'):
+            self.assertEqual(sorted(org.iter_photo()), [src / '3.jpg', src / 'b' / '2.jpg'])
+
+
+class TestFindDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.org = PhotoOrganizer(self.tmp, self.tmp, 'UTC')
+
+    def write(self, name: str, data: bytes) -> Path:
+        path = self.tmp / name
+        path.write_bytes(data)
+        return path
+
+    def test_find_duplicates(self):
+        head = os.urandom(64 * 1024)
+        original = self.write('a.jpg', head + b'tail')
+        duplicate = self.write('b.jpg', head + b'tail')
+        # Same size as the above, but another head
+        other_head = self.write('c.jpg', os.urandom(len(head)) + b'tail')
+        # Same size and head as the above, but another tail
+        other_tail = self.write('d.jpg', head + b'TAIL')
+        unique = self.write('e.jpg', b'unique')
+        # Empty files are never duplicates of each other
+        empty1 = self.write('f.jpg', b'')
+        empty2 = self.write('g.jpg', b'')
+
+        photos = [empty2, duplicate, unique, other_tail, original, empty1, other_head]
+        to_process, duplicates = self.org._find_duplicates(photos, max_workers=2)
+        self.assertEqual(duplicates, [(original, duplicate)])
+        self.assertEqual([photo for photo, _ in to_process], [original, other_head, other_tail, unique, empty1, empty2])
+        for photo, st in to_process:
+            self.assertEqual(st, photo.stat())
+
+    def test_unreadable(self):
+        missing = self.tmp / 'missing.jpg'
+        to_process, duplicates = self.org._find_duplicates([missing], max_workers=2)
+        # Left to the normal path, which reports it as skipped
+        self.assertEqual(to_process, [(missing, None)])
+        self.assertEqual(duplicates, [])
+
+
+class TestDeleteDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.src = Path(tmp.name, 'import')
+        self.dst = Path(tmp.name, 'Camera_Roll')
+        self.src.mkdir()
+        self.org = PhotoOrganizer(self.src, self.dst, 'UTC')
+        self.org.max_concurrency = 2
+
+    def write(self, name: str, data: bytes) -> Path:
+        path = self.src / name
+        path.write_bytes(data)
+        os.utime(path, (1577836800, 1577836800))  # 2020-01-01 00:00:00 UTC
+        return path
+
+    def test_deleted_with_original(self):
+        # Screenshots get their datetime from mtime
+        self.org.allow_mtime = True
+        original = self.write('a.png', b'screenshot')
+        duplicate = self.write('b.png', b'screenshot')
+        self.org._prepare_rename_tasks(self.org.iter_photo())
+        self.assertEqual([task.photo_info.path for task in self.org.rename_tasks], [original])
+        self.assertEqual([info.path for info in self.org.skipped_items], [duplicate])
+        self.org._do_rename()
+        self.assertEqual(list(self.src.iterdir()), [])
+        self.assertTrue(self.org.rename_tasks[0].destination.exists())
+
+    def test_kept_with_original(self):
+        # Without mtime, the original is skipped: keep the copy for the next run
+        self.write('a.png', b'screenshot')
+        self.write('b.png', b'screenshot')
+        self.org._prepare_rename_tasks(self.org.iter_photo())
+        self.assertEqual(self.org.duplicates, [])
+        self.org._do_rename()
+        self.assertEqual(len(list(self.src.iterdir())), 2)
+
+    def test_changed(self):
+        self.org.allow_mtime = True
+        self.write('a.png', b'screenshot')
+        duplicate = self.write('b.png', b'screenshot')
+        self.org._prepare_rename_tasks(self.org.iter_photo())
+        duplicate.write_bytes(b'SCREENSHOT')
+        with self.assertLogs('phtorg.organizer', 'ERROR'):
+            self.org._do_rename()
+        self.assertEqual(list(self.src.iterdir()), [duplicate])
+
+
+class TestDoRename(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.org = PhotoOrganizer(self.tmp, self.tmp, 'UTC')
+        self.org.max_concurrency = 2
+
+    def add_task(self, src: Path, dst: Path) -> None:
+        info = PhotoInfo(src, datetime(2020, 1, 1, tzinfo=ZoneInfo('UTC')), 'mtime')
+        self.org.rename_tasks.append(RenameTask(info, dst))
+
+    def test_collisions(self):
+        (self.tmp / '2020').mkdir()
+        # A dangling symlink at the destination
+        dangling = self.tmp / 'a.png'
+        dangling.write_bytes(b'a')
+        (self.tmp / '2020' / 'a.png').symlink_to(self.tmp / 'missing.png')
+        self.add_task(dangling, self.tmp / '2020' / 'a.png')
+        # A source that has vanished, with a destination that exists
+        (self.tmp / '2020' / 'b.png').write_bytes(b'b')
+        self.add_task(self.tmp / 'vanished.png', self.tmp / '2020' / 'b.png')
+        # The same file under another spelling
+        in_place = self.tmp / '2020' / 'c.png'
+        in_place.write_bytes(b'c')
+        self.add_task(in_place, self.tmp / '2020' / '..' / '2020' / 'c.png')
+
+        with self.assertLogs('phtorg.organizer', 'ERROR') as logs:
+            self.org._do_rename()
+        self.assertEqual(len(logs.records), 1)
+        self.assertTrue(logs.records[0].getMessage().startswith('Failed to rename 2 files:'))
+        self.assertEqual(dangling.read_bytes(), b'a')
+
+
+class TestHashPool(unittest.TestCase):
+
+    def test_same_as_inline(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        src = Path(tmp.name, 'import')
+        src.mkdir()
+        (src / 'a.jpg').write_bytes(make_jpeg(DATETIME_ORIGINAL='2021:01:02 03:04:05'))
+        (src / 'b.mp4').write_bytes((FIXTURES / 'faststart.mp4').read_bytes())
+
+        inline = PhotoOrganizer(src, Path(tmp.name, 'dst'), 'UTC')
+        expected = sorted(inline._get_rename_task(photo) for photo in inline.iter_photo())
+        # Send every file to the process pool: read_exif_and_hash() for the
+        # JPEG, hash_file() for the video
+        org = PhotoOrganizer(src, Path(tmp.name, 'dst'), 'UTC')
+        org.inline_hash_size = 0
+        org.max_concurrency = 2
+        org._prepare_rename_tasks(org.iter_photo())
+        self.assertEqual(org.skipped_items, [])
+        self.assertEqual(sorted(org.rename_tasks), expected)
+
+
+class TestTrustNames(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.org = PhotoOrganizer(self.tmp, self.tmp, 'UTC')
+        # Screenshots get their datetime from mtime
+        self.org.allow_mtime = True
+        self.org.trust_names = True
+
+    def write(self, name: str) -> Path:
+        path = self.tmp / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b'screenshot')
+        os.utime(path, (1577836800, 1577836800))  # 2020-01-01 00:00:00 UTC
+        return path
+
+    def test_looks_organized(self):
+        self.assertTrue(self.org._looks_organized(Path('2020/IMG_20200101_000000_abcdef1.png')))
+        self.assertFalse(self.org._looks_organized(Path('import/IMG_20200101_000000_abcdef1.png')))
+        self.assertFalse(self.org._looks_organized(Path('2020/IMG_20200101_000000_ABCDEF1.png')))
+        self.assertFalse(self.org._looks_organized(Path('2020/IMG_1234.png')))
+
+    def test_hash_from_name(self):
+        # Not the hash of the content: it must not be computed
+        photo = self.write('2020/IMG_20200101_000000_abcdef1.png')
+        info, h = self.org._get_info_and_hash(photo)
+        self.assertEqual(h, 'abcdef1')
+        self.assertEqual(self.org._get_rename_task(photo).destination, photo)
+
+    def test_not_at_destination(self):
+        # The datetime in the name is not the one of the file
+        photo = self.write('2020/IMG_20200102_000000_abcdef1.png')
+        info, h = self.org._get_info_and_hash(photo)
+        self.assertIsNone(self.org._hash_from_name(photo, info))
+        self.assertNotEqual(h, 'abcdef1')
+
+    def test_not_trusted(self):
+        self.org.trust_names = False
+        photo = self.write('2020/IMG_20200101_000000_abcdef1.png')
+        _, h = self.org._get_info_and_hash(photo)
+        self.assertNotEqual(h, 'abcdef1')
+
+
+class TestGetInfoCached(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.video = self.tmp / 'a.mp4'
+        self.video.write_bytes((FIXTURES / 'faststart.mp4').read_bytes())
+
+    def test_no_cache(self):
+        org = PhotoOrganizer(self.tmp, self.tmp, 'UTC')
+        with mock.patch.object(Path, 'stat', autospec=True, side_effect=Path.stat) as stat:
+            info = org.get_info_cached(self.video)
+        self.assertEqual(info.datetime_source, 'QuickTime')
+        stat.assert_not_called()
+
+    def test_cache(self):
+        cache_path = self.tmp / 'cache.sqlite'
+        dt = datetime(2020, 1, 1, tzinfo=ZoneInfo('UTC'))
+        cache = InfoCache(cache_path)
+        cache.put(self.video, self.video.stat(), 'UTC', 'sha1', dt, 'EXIF', 'a1b2c3d')
+        cache.close()
+        org = PhotoOrganizer(self.tmp, self.tmp, 'UTC', cache_path, cache_readonly=True)
+        self.addCleanup(org.cache.close)
+        self.assertEqual(org.get_info_cached(self.video), PhotoInfo(self.video, dt, 'EXIF'))
+
+
+class TestCache(unittest.TestCase):
+
+    def test_dst_gap(self):
+        # 02:30 does not exist in Vancouver on that day: the cache must give
+        # back the same wall time, and so the same filename
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        tmp_dir = Path(tmp.name)
+        photo = tmp_dir / 'a.jpg'
+        photo.write_bytes(make_jpeg(DATETIME_ORIGINAL='2021:03:14 02:30:00'))
+        for _ in range(2):
+            org = PhotoOrganizer(tmp_dir, tmp_dir, 'America/Vancouver', tmp_dir / 'cache.sqlite')
+            task = org._get_rename_task(photo)
+            self.assertEqual(task.destination.name[:20], 'IMG_20210314_023000_')
+            self.assertEqual(org.get_info_cached(photo).datetime, task.photo_info.datetime)
+            org.cache.close()
+
+
+class Row(tuple):
+
+    def row(self) -> tuple:
+        return self
+
+
+class TestIterTable(unittest.TestCase):
+
+    def assertSameAsTabulate(self, records, headers):
+        self.assertEqual(''.join(iter_table(records, headers)), tabulate([r.row() for r in records], headers=headers, disable_numparse=True) + '\n')
+
+    def test_mixed(self):
+        records = [
+            Row(('照片/IMG_0001.jpg', '1', None, 'Duplicate of 照片/IMG_0000.jpg')),
+            Row(('2024/10.jpg', '10', '2.50', '')),
+            Row(('  padded.jpg  ', '-3', '1e5', 'first line\nsecond, longer line')),
+            Row(('x.mov', '', 'nan', '多行\n文字\n')),
+        ]
+        self.assertSameAsTabulate(records, ['src', 'n', 'number', 'errors'])
+
+    def test_tasks(self):
+        dt = datetime(2024, 12, 31, 13, 14, 15, tzinfo=ZoneInfo('Asia/Tokyo'))
+        info = PhotoInfo(Path('import/写真.jpg'), dt, 'EXIF')
+        self.assertSameAsTabulate([RenameTask(info, Path('Camera_Roll/2024/IMG_20241231_131415_a1b2c3d.jpg'))], RenameTask.header())
+        self.assertSameAsTabulate([PhotoInfo.no_datetime(Path('import/a.png'), 'No datetime'), PhotoInfo(Path('b.jpg'), dt, 'EXIF')], PhotoInfo.header())
+
+    def test_empty(self):
+        self.assertSameAsTabulate([], PhotoInfo.header())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import struct
+import unittest
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from phtorg import quicktime
+from phtorg.organizer import PhotoOrganizer
+
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+# faststart.mp4: `moov` before `mdat`; trailing_moov.mp4: `moov` after `mdat`
+CREATION_TIME = datetime(2021, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+# apple_keys.mov: the above in `mvhd`, and this com.apple.quicktime.creationdate
+APPLE_CREATION_DATE = datetime(2022, 7, 8, 9, 10, 11, tzinfo=timezone(timedelta(hours=2)))
+
+
+class TestReadCreationDate(unittest.TestCase):
+
+    def test_fast_start(self):
+        self.assertEqual(quicktime.read_creation_date(FIXTURES / 'faststart.mp4'), CREATION_TIME)
+
+    def test_trailing_moov(self):
+        self.assertEqual(quicktime.read_creation_date(FIXTURES / 'trailing_moov.mp4'), CREATION_TIME)
+
+    def test_apple_keys(self):
+        dt = quicktime.read_creation_date(FIXTURES / 'apple_keys.mov')
+        self.assertEqual(dt, APPLE_CREATION_DATE)
+        self.assertEqual(dt.utcoffset(), timedelta(hours=2))
+
+    def test_no_moov(self):
+        data = (FIXTURES / 'trailing_moov.mp4').read_bytes()
+        with self.assertRaises(ValueError):
+            quicktime.read_creation_date_fileobj(io.BytesIO(data[:data.index(b'moov') - 4]))
+
+    def test_no_creation_time(self):
+        data = bytearray((FIXTURES / 'faststart.mp4').read_bytes())
+        # Zero the creation and modification times of `mvhd` (version 0)
+        offset = data.index(b'mvhd') + 4
+        struct.pack_into('>BxxxII', data, offset, 0, 0, 0)
+        self.assertIsNone(quicktime.read_creation_date_fileobj(io.BytesIO(data)))
+
+
+class TestSameAsMediaInfo(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.org = PhotoOrganizer(Path(tmp.name), Path(tmp.name), 'Asia/Tokyo')
+
+    def test_fixtures(self):
+        for name in ('faststart.mp4', 'trailing_moov.mp4', 'apple_keys.mov'):
+            with self.subTest(name):
+                info = self.org.get_info_from_quicktime(FIXTURES / name)
+                self.assertEqual(info.datetime_source, 'QuickTime')
+                self.assertEqual(info.datetime, self.org.get_info_from_mediainfo(FIXTURES / name).datetime)
+
+    def test_falls_back_to_mediainfo(self):
+        with TemporaryDirectory() as tmp:
+            video = Path(tmp, 'a.mp4')
+            video.write_bytes(b'not a video')
+            with mock.patch.object(self.org, 'get_info_from_mediainfo') as get_info_from_mediainfo:
+                self.org.get_info_from_quicktime(video)
+            get_info_from_mediainfo.assert_called_once_with(video)
+
+
+if __name__ == '__main__':
+    unittest.main()
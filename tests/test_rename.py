@@ -0,0 +1,69 @@
+import os
+import errno
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from phtorg import rename
+
+
+class TestRenameNoreplace(unittest.TestCase):
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.src = Path(tmp.name, 'src.jpg')
+        self.dst = Path(tmp.name, 'dst.jpg')
+        self.src.write_bytes(b'src')
+
+    def test_rename(self):
+        rename.rename_noreplace(self.src, self.dst)
+        self.assertFalse(self.src.exists())
+        self.assertEqual(self.dst.read_bytes(), b'src')
+
+    def test_collision(self):
+        self.dst.write_bytes(b'dst')
+        with self.assertRaises(FileExistsError):
+            rename.rename_noreplace(self.src, self.dst)
+        self.assertEqual(self.src.read_bytes(), b'src')
+        self.assertEqual(self.dst.read_bytes(), b'dst')
+
+    def test_collision_without_renameat2(self):
+        self.dst.write_bytes(b'dst')
+        with mock.patch.object(rename, '_renameat2', return_value=None):
+            with self.assertRaises(FileExistsError):
+                rename.rename_noreplace(self.src, self.dst)
+        self.assertEqual(self.dst.read_bytes(), b'dst')
+
+
+class TestMoveAcrossDevices(TestRenameNoreplace):
+    '''Same as above, but as if `src` and `dst` were on different filesystems'''
+
+    def setUp(self):
+        super().setUp()
+        os.utime(self.src, ns=(0, 1_000_000_000))
+        rename_noreplace = rename._rename_noreplace
+
+        def cross_device(src, dst):
+            # Only the temporary copy is next to `dst`
+            if Path(src) == self.src:
+                raise OSError(errno.EXDEV, os.strerror(errno.EXDEV), os.fspath(src))
+            rename_noreplace(src, dst)
+
+        patcher = mock.patch.object(rename, '_rename_noreplace', cross_device)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rename(self):
+        super().test_rename()
+        self.assertEqual(self.dst.stat().st_mtime_ns, 1_000_000_000)
+        self.assertEqual(sorted(self.dst.parent.iterdir()), [self.dst])
+
+    def test_collision(self):
+        super().test_collision()
+        self.assertEqual(sorted(self.dst.parent.iterdir()), [self.dst, self.src])
+
+
+if __name__ == '__main__':
+    unittest.main()
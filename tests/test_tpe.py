@@ -0,0 +1,70 @@
+import time
+import threading
+import unittest
+
+from phtorg.tpe import tpe_submit
+
+
+class TestTpeSubmit(unittest.TestCase):
+
+    def test_completed_and_failed(self):
+        def func(item):
+            if item % 3 == 0:
+                raise ValueError(item)
+            return item * 2
+
+        completed, failed = tpe_submit(func, range(10), max_workers=2)
+        self.assertEqual(sorted(completed), [(i, i * 2) for i in range(10) if i % 3])
+        self.assertEqual(sorted(item for item, _ in failed), [0, 3, 6, 9])
+        for item, e in failed:
+            self.assertIsInstance(e, ValueError)
+            self.assertEqual(e.args, (item,))
+
+    def test_raise_exception(self):
+        def func(item):
+            if item == 5:
+                raise ValueError(item)
+            return item
+
+        with self.assertRaises(ValueError):
+            tpe_submit(func, range(10), raise_exception=True, max_workers=2)
+
+    def test_window(self):
+        lock = threading.Lock()
+        finished = 0
+        in_flight = []
+
+        def items():
+            for i in range(100):
+                with lock:
+                    in_flight.append(i - finished)
+                yield i
+
+        def func(item):
+            nonlocal finished
+            time.sleep(0.001)
+            with lock:
+                finished += 1
+            return item
+
+        completed, failed = tpe_submit(func, items(), max_workers=2)
+        self.assertEqual(sorted(item for item, _ in completed), list(range(100)))
+        self.assertEqual(failed, [])
+        # Items are pulled from the generator as tasks complete, at most
+        # twice max_workers at a time
+        self.assertLessEqual(max(in_flight), 2 * 2 - 1)
+
+    def test_keyboard_interrupt(self):
+        def func(item):
+            if item == 3:
+                raise KeyboardInterrupt
+            return item
+
+        # Returning what has completed so far would let the caller carry on
+        # with part of the items
+        with self.assertRaises(KeyboardInterrupt):
+            tpe_submit(func, range(10), max_workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()